@@ -0,0 +1,109 @@
+"""Список постов в админке: прежняя конфигурация PostAdmin против новой.
+
+Прежняя конфигурация подгружает автора отдельным запросом на строку,
+выбор группы в каждой строке запрашивает все группы, а пагинация
+и поиск считают COUNT(*) по всей таблице. Для каждого режима
+замеряется время view со рендерингом шаблона и число запросов.
+
+    python -m benchmarks.bench_admin_changelist --posts 1000000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import seed_posts, setup_django, timed
+
+GROUPS = 50
+RARE = 'редкость'
+
+
+def seed(count):
+    from django.db import connection
+
+    from posts.models import Group
+
+    seed_posts(count, authors=1000)
+    Group.objects.bulk_create(
+        Group(title=f'Группа {number}', slug=f'group-{number}',
+              description='Описание')
+        for number in range(GROUPS)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE posts_post SET group_id = '
+            '(SELECT MIN(id) FROM posts_group) + id %% %s', [GROUPS]
+        )
+        cursor.execute(
+            "UPDATE posts_post SET text = text || ' ' || %s "
+            'WHERE id %% 1000 = 0', [RARE]
+        )
+
+
+def legacy_admin():
+    from django.contrib import admin
+
+    from posts.models import Post
+
+    class LegacyPostAdmin(admin.ModelAdmin):
+        list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+        list_editable = ('group',)
+        search_fields = ('text',)
+        list_filter = ('pub_date',)
+        empty_value_display = '-пусто-'
+
+    return LegacyPostAdmin(Post, admin.site)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        seed(args.posts)
+        run(args.posts, args.repeat)
+
+
+def run(count, repeat):
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+
+    from posts.models import Post
+
+    user = get_user_model().objects.create_superuser(
+        username='admin', email='admin@example.com', password='pass'
+    )
+    factory = RequestFactory()
+    admins = (
+        ('прежний', legacy_admin()),
+        ('новый', admin.site._registry[Post]),
+    )
+    pages = (
+        ('стр. 1', {}),
+        ('середина', {'p': count // 200}),
+        ('поиск', {'q': RARE}),
+    )
+    print(f'{"админка":>8} {"страница":>10} {"ms":>9} {"запросов":>9}')
+    for title, model_admin in admins:
+        for page, params in pages:
+            def view():
+                request = factory.get('/admin/posts/post/', params)
+                request.user = user
+                response = model_admin.changelist_view(request)
+                response.render()
+                return response
+
+            view()
+            with CaptureQueriesContext(connection) as context:
+                view()
+            elapsed, _ = timed(view, repeat)
+            print(f'{title:>8} {page:>10} {elapsed * 1000:>9.1f} '
+                  f'{len(context.captured_queries):>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Пропускная способность SQLiteCache в сравнении с LocMemCache.
+
+Первая часть — операции в секунду в одном процессе: чтение страницы
+~30 КБ, запись, incr и get_many из десяти ключей. Вторая — несколько
+процессов-«воркеров» читают одни и те же страницы: с LocMem каждый
+рендерит каждую страницу сам, с общим кешем страница рендерится один раз
+на хост.
+
+    python -m benchmarks.bench_cache_backend --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import PROJECT_DIR, timed
+
+sys.path.insert(0, PROJECT_DIR)
+
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from core.cache_backends.sqlite import SQLiteCache  # noqa: E402
+
+PAGE = 'x' * 30 * 1024
+PAGES = 50
+OPERATIONS = 2000
+
+
+def make_cache(kind, location):
+    params = {'OPTIONS': {'MAX_ENTRIES': 10 ** 6}}
+    if kind == 'locmem':
+        return LocMemCache(location, params)
+    return SQLiteCache(location, params)
+
+
+def single_process(cache, repeat):
+    cache.set('page', PAGE)
+    for number in range(10):
+        cache.set(f'key:{number}', number)
+    cache.set('counter', 0)
+    keys = [f'key:{number}' for number in range(10)]
+    operations = {
+        'get': lambda: cache.get('page'),
+        'set': lambda: cache.set('page', PAGE),
+        'incr': lambda: cache.incr('counter'),
+        'get_many(10)': lambda: cache.get_many(keys),
+    }
+    results = {}
+    for name, operation in operations.items():
+        def loop():
+            for _ in range(OPERATIONS):
+                operation()
+        median, _ = timed(loop, repeat)
+        results[name] = OPERATIONS / median
+    return results
+
+
+def worker(kind, location, requests, queue):
+    cache = make_cache(kind, location)
+    renders = 0
+    started = time.perf_counter()
+    for number in range(requests):
+        key = f'page:{number % PAGES}'
+        if cache.get(key) is None:
+            renders += 1
+            cache.set(key, PAGE)
+    queue.put((renders, time.perf_counter() - started))
+
+
+def multi_process(kind, location, workers, requests):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(kind, location, requests, queue))
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    renders = sum(result[0] for result in results)
+    return renders, workers * requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, 'cache.sqlite3')
+        print('Один процесс, операций в секунду:')
+        print(f'{"операция":>14} {"locmem":>12} {"sqlite":>12}')
+        locmem = single_process(make_cache('locmem', 'bench'), args.repeat)
+        sqlite = single_process(make_cache('sqlite', location), args.repeat)
+        for name in locmem:
+            print(f'{name:>14} {locmem[name]:>12.0f} {sqlite[name]:>12.0f}')
+        make_cache('sqlite', location).clear()
+        print(f'\n{args.workers} процессов по {args.requests} чтений '
+              f'{PAGES} страниц:')
+        print(f'{"бэкенд":>14} {"рендеров":>12} {"чтений/с":>12}')
+        for kind in ('locmem', 'sqlite'):
+            renders, throughput = multi_process(
+                kind, location if kind == 'sqlite' else 'bench',
+                args.workers, args.requests,
+            )
+            print(f'{kind:>14} {renders:>12} {throughput:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
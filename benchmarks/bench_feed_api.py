@@ -0,0 +1,63 @@
+"""JSON API лент против HTML-страниц.
+
+Для главной страницы, ленты группы и ленты автора замеряются время
+ответа и его размер: HTML-страница, JSON со всеми полями и JSON
+только с полями из --fields. Кеш страниц отключён (DummyCache), чтобы
+каждый запрос собирал ответ заново.
+
+    python -m benchmarks.bench_feed_api --posts 100000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import seed_posts, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--fields', default='id,author,text')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'), caches={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+            }
+        })
+        from django.test import Client
+
+        from posts.models import Group, Post
+
+        users = seed_posts(args.posts)
+        group = Group.objects.create(title='Группа', slug='bench')
+        Post.objects.filter(pk__lte=args.posts // 2).update(group=group)
+
+        client = Client()
+        feeds = (
+            ('index', '/', '/api/posts/'),
+            ('group', '/group/bench/', '/api/group/bench/'),
+            ('profile', f'/profile/{users[0].username}/',
+             f'/api/profile/{users[0].username}/'),
+        )
+        print(f'{"лента":>8} {"ответ":>7} {"медиана, ms":>12} '
+              f'{"лучшее, ms":>11} {"КБ":>7}')
+        for name, html_url, api_url in feeds:
+            for kind, url, params in (
+                ('html', html_url, {}),
+                ('json', api_url, {}),
+                ('fields', api_url, {'fields': args.fields}),
+            ):
+                response = client.get(url, params)
+                assert response.status_code == 200, url
+                median, best = timed(
+                    lambda: client.get(url, params), args.repeat
+                )
+                print(f'{name:>8} {kind:>7} {median * 1000:>12.2f} '
+                      f'{best * 1000:>11.2f} '
+                      f'{len(response.content) / 1024:>7.1f}')
+
+
+if __name__ == '__main__':
+    main()
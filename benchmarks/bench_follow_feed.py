@@ -0,0 +1,106 @@
+"""Сравнение путей чтения ленты подписок: push, pull и исходный JOIN.
+
+* push — материализованная лента TimelineEntry;
+* pull — слияние кучей списков последних постов каждого автора
+  (все авторы считаются знаменитостями), кеш прогрет;
+* pull (cold) — то же без списков последних постов в кеше;
+* join — исходный запрос Post по author__following__user.
+
+    python -m benchmarks.bench_follow_feed --follows 10 1000 10000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import setup_django, timed
+
+POSTS_PER_AUTHOR = 5
+
+
+def seed(follows):
+    from django.contrib.auth import get_user_model
+    from posts import feeds
+    from posts.models import Follow, Post, TimelineEntry
+
+    User = get_user_model()
+    Follow.objects.all().delete()
+    TimelineEntry.objects.all().delete()
+    Post.objects.all().delete()
+    User.objects.all().delete()
+    reader = User.objects.create_user(username='reader')
+    User.objects.bulk_create(
+        User(username=f'author_{number}') for number in range(follows)
+    )
+    authors = list(User.objects.filter(username__startswith='author_'))
+    Post.objects.bulk_create(
+        (
+            Post(text=f'Пост {number}', author=author)
+            for author in authors for number in range(POSTS_PER_AUTHOR)
+        )
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for author in authors
+    )
+    feeds.rebuild(reader.id)
+    return reader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--follows', nargs='+', type=int,
+                        default=[10, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        from django.core.cache import cache
+        from django.test.utils import override_settings
+        from core.utils.paginate_page import KeysetPaginator
+        from posts.feeds import RECENT_POSTS_KEY, TimelinePaginator
+        from posts.models import Post
+
+        def push_page(reader):
+            with override_settings(FEED_CELEBRITY_FOLLOWERS=10 ** 9):
+                TimelinePaginator(reader, 10).page()
+
+        def pull_page(reader):
+            with override_settings(FEED_CELEBRITY_FOLLOWERS=1):
+                TimelinePaginator(reader, 10).page()
+
+        def cold_pull_page(reader):
+            recent_keys = [
+                RECENT_POSTS_KEY.format(author_id) for author_id in
+                reader.follower.values_list('author_id', flat=True)
+            ]
+
+            def run():
+                cache.delete_many(recent_keys)
+                pull_page(reader)
+            return run
+
+        def join_page(reader):
+            posts = Post.objects.filter(author__following__user=reader)
+            KeysetPaginator(posts, 10).page()
+
+        print(f'{"follows":>8} {"path":>12} {"median, ms":>11} '
+              f'{"best, ms":>9}')
+        for follows in args.follows:
+            reader = seed(follows)
+            paths = (
+                ('push', lambda: push_page(reader)),
+                ('pull', lambda: pull_page(reader)),
+                ('pull (cold)', cold_pull_page(reader)),
+                ('join', lambda: join_page(reader)),
+            )
+            for name, run in paths:
+                # Список знаменитостей зависит от порога, его кеш
+                # сбрасывается при смене пути.
+                cache.clear()
+                run()
+                median, best = timed(run, args.repeat)
+                print(f'{follows:>8} {name:>12} {median * 1000:>11.2f} '
+                      f'{best * 1000:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Состояние кнопок подписки для страницы ленты из 10 карточек.
+
+``exists`` — запрос Follow.exists() на каждую карточку, ``cached`` —
+одно чтение закешированного множества подписок (posts.follows).
+Пользователь подписан на --follows авторов; выводится и размер
+значения в кеше.
+
+    python -m benchmarks.bench_follow_state --follows 5000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import seed_posts, setup_django, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--follows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(
+            os.path.join(directory, 'bench.sqlite3'),
+            caches={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+            }},
+        )
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+
+        from posts import follows
+        from posts.models import Follow, Post
+
+        User = get_user_model()
+        seed_posts(100)
+        reader = User.objects.create_user(username='reader')
+        User.objects.bulk_create(
+            User(username=f'author_{number}')
+            for number in range(args.follows)
+        )
+        follows.follow_many(
+            (reader.pk, author_id) for author_id in User.objects.filter(
+                username__startswith='author_'
+            ).values_list('pk', flat=True)
+        )
+        authors = list(Post.objects.for_feed()[:10].values_list(
+            'author_id', flat=True
+        ))
+
+        def exists():
+            return [Follow.objects.filter(
+                user_id=reader.pk, author_id=author_id
+            ).exists() for author_id in authors]
+
+        def cached():
+            user = User(pk=reader.pk)
+            ids = follows.following_ids(user)
+            return [author_id in ids for author_id in authors]
+
+        assert exists() == cached()
+        stored = cache.get(follows.FOLLOWING_KEY.format(reader.pk))
+        print(f'{"режим":>8} {"медиана, ms":>12} {"лучшее, ms":>11}')
+        for name, func in (('exists', exists), ('cached', cached)):
+            median, best = timed(func, args.repeat)
+            print(f'{name:>8} {median * 1000:>12.3f} {best * 1000:>11.3f}')
+        print(f'значение в кеше: {len(stored)} байт')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Главная страница для авторизованных посетителей: общий кеш тела
+страницы с дырами против рендеринга на каждый запрос.
+
+Каждый из --users пользователей открывает главную страницу; в режиме
+``render`` кеш страниц отключён (DummyCache), в режиме ``holes``
+тело страницы берётся из общего кеша, а шапка рендерится для
+посетителя. Каждый режим запускается в отдельном процессе.
+
+    python -m benchmarks.bench_hole_punching --users 200
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BASE_DIR, percentile, seed_posts, setup_django
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+DUMMY = 'django.core.cache.backends.dummy.DummyCache'
+
+
+def run(directory, mode, users):
+    backend = DUMMY if mode == 'render' else LOCMEM
+    setup_django(
+        os.path.join(directory, 'bench.sqlite3'),
+        caches={'default': {'BACKEND': backend}},
+    )
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    from core.utils.page_cache import cache_stats
+
+    User = get_user_model()
+    if not User.objects.filter(username='reader_0').exists():
+        seed_posts(1000)
+        User.objects.bulk_create(
+            User(username=f'reader_{number}') for number in range(users)
+        )
+    samples = []
+    for user in User.objects.filter(username__startswith='reader_'):
+        client = Client()
+        client.force_login(user)
+        started = time.perf_counter()
+        response = client.get('/')
+        samples.append(time.perf_counter() - started)
+        assert f'Пользователь: {user.username}' in response.content.decode()
+    stats = cache_stats('index_page')['index_page']
+    print(f'{mode:>8} {percentile(samples, 0.5) * 1000:>9.2f} '
+          f'{percentile(samples, 0.99) * 1000:>9.2f} '
+          f'{stats["hits"]:>9} {stats["misses"]:>9}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--mode', choices=('render', 'holes'))
+    parser.add_argument('--directory')
+    args = parser.parse_args()
+    if args.mode:
+        run(args.directory, args.mode, args.users)
+        return
+    print(f'{"режим":>8} {"p50, ms":>9} {"p99, ms":>9} '
+          f'{"попаданий":>9} {"промахов":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('render', 'holes'):
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_hole_punching',
+                 '--mode', mode, '--directory', directory,
+                 '--users', str(args.users)],
+                cwd=BASE_DIR, check=True,
+            )
+
+
+if __name__ == '__main__':
+    main()
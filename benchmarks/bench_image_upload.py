@@ -0,0 +1,110 @@
+"""Память и время нормализации большой загруженной картинки.
+
+``naive`` декодирует картинку целиком и делает копии на каждом шаге
+(поворот по EXIF, перевод в RGB, ресайз). ``normalize`` — функция
+core.utils.images.normalize_image из PostForm. Каждый замер идёт
+в отдельном процессе, память — прирост пикового RSS (VmHWM из
+/proc/self/status, поэтому только Linux).
+
+    python -m benchmarks.bench_image_upload
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BASE_DIR, PROJECT_DIR
+
+MAX_SIZE = 2560
+QUALITY = 85
+INPUTS = (
+    ('24 Мп JPEG', 'JPEG', (6000, 4000)),
+    ('12 Мп PNG', 'PNG', (4000, 3000)),
+)
+
+
+def peak_rss():
+    """Пиковый RSS процесса в МБ."""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError('VmHWM недоступен')
+
+
+def make_input(path, image_format, size):
+    from PIL import Image, ImageFilter
+
+    image = Image.effect_noise(size, 30).convert('RGB')
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    image.save(path, image_format, exif=exif)
+
+
+def naive(path):
+    from io import BytesIO
+
+    from PIL import Image, ImageOps
+
+    image = Image.open(path)
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    ratio = MAX_SIZE / max(image.size)
+    image = image.resize(
+        (round(image.width * ratio), round(image.height * ratio)),
+        Image.LANCZOS,
+    )
+    image.save(BytesIO(), 'JPEG', quality=QUALITY, progressive=True)
+
+
+def normalize(path):
+    from django.core.files import File
+
+    from core.utils.images import normalize_image
+
+    with open(path, 'rb') as source:
+        normalize_image(File(source, name=path), MAX_SIZE, QUALITY)
+
+
+def child(path, mode):
+    sys.path.insert(0, PROJECT_DIR)
+    function = naive if mode == 'naive' else normalize
+    # Импорты заранее, чтобы они не попали в замер.
+    import django.core.files  # noqa: F401
+    from PIL import Image, ImageOps  # noqa: F401
+
+    from core.utils import images  # noqa: F401
+    before = peak_rss()
+    started = time.perf_counter()
+    function(path)
+    elapsed = time.perf_counter() - started
+    print(elapsed, peak_rss() - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--child', nargs=2, metavar=('PATH', 'MODE'))
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    print(f'{"input":>12} {"mode":>10} {"time, ms":>9} {"peak, MB":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for title, image_format, size in INPUTS:
+            path = os.path.join(directory, f'input.{image_format.lower()}')
+            make_input(path, image_format, size)
+            for mode in ('naive', 'normalize'):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_image_upload',
+                     '--child', path, mode],
+                    cwd=BASE_DIR, check=True, capture_output=True, text=True,
+                ).stdout.split()
+                elapsed, peak = (float(value) for value in output[-2:])
+                print(f'{title:>12} {mode:>10} {elapsed * 1000:>9.0f} '
+                      f'{peak:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Пиковая память (RSS) холодного рендера главной страницы.
+
+Для каждого размера таблицы постов база готовится в одном процессе,
+а рендер выполняется в новом процессе, чтобы ru_maxrss отражал только
+рендер. Режим ``list`` воспроизводит старое поведение index
+(get_list_or_404 загружает всю таблицу) для сравнения.
+
+    python -m benchmarks.bench_index_memory --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import BASE_DIR, setup_django, seed_posts
+
+
+def build(db_path, size):
+    setup_django(db_path)
+    seed_posts(size, text_size=1000)
+
+
+def render(db_path, mode):
+    setup_django(db_path, migrate=False)
+    from django.shortcuts import get_list_or_404
+    from django.test import Client
+    from posts import views
+
+    if mode == 'list':
+        paginator_page = views.paginator_page
+
+        def materializing_paginator_page(post_list, request, *args):
+            return paginator_page(get_list_or_404(post_list), request)
+        views.paginator_page = materializing_paginator_page
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    response = Client().get('/')
+    assert response.status_code == 200, response.status_code
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(before, after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--child', nargs=3, metavar=('ACTION', 'DB', 'ARG'))
+    args = parser.parse_args()
+    if args.child:
+        action, db_path, arg = args.child
+        if action == 'build':
+            build(db_path, int(arg))
+        else:
+            render(db_path, arg)
+        return
+    print(f'{"posts":>8} {"mode":>5} {"rss before, MB":>15} '
+          f'{"peak rss, MB":>13} {"delta, MB":>10}')
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, 'bench.sqlite3')
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_index_memory',
+                 '--child', 'build', db_path, str(size)],
+                cwd=BASE_DIR, check=True,
+            )
+            for mode in ('lazy', 'list'):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_index_memory',
+                     '--child', 'render', db_path, mode],
+                    cwd=BASE_DIR, check=True, capture_output=True, text=True,
+                ).stdout.split()
+                # ru_maxrss в Linux измеряется в килобайтах.
+                before, after = (int(value) / 1024 for value in output[-2:])
+                print(f'{size:>8} {mode:>5} {before:>15.1f} '
+                      f'{after:>13.1f} {after - before:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Время шаблона страницы ленты с кешем карточек постов и без него.
+
+Режим ``off`` подменяет кеш фрагментов на DummyCache (каждая карточка
+рендерится заново), ``warm`` рендерит с прогретым кешем карточек.
+Каждый режим запускается в отдельном процессе.
+
+    python -m benchmarks.bench_post_card
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import BASE_DIR, setup_django, timed
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+DUMMY = 'django.core.cache.backends.dummy.DummyCache'
+
+
+def run(directory, mode, repeat):
+    caches = {
+        'default': {'BACKEND': LOCMEM},
+        'template_fragments': {'BACKEND': DUMMY if mode == 'off' else LOCMEM},
+    }
+    setup_django(os.path.join(directory, 'bench.sqlite3'), caches=caches)
+    from django.conf import settings
+    settings.MEDIA_ROOT = os.path.join(directory, 'media')
+    from io import BytesIO
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from PIL import Image
+
+    from core.utils.paginate_page import paginator_page
+    from posts.models import Group, Post, User
+
+    if not Post.objects.exists():
+        author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(10):
+            buffer = BytesIO()
+            Image.new('RGB', (1600, 1200), (number * 20, 80, 160)).save(
+                buffer, 'JPEG'
+            )
+            Post.objects.create(
+                author=author, group=group, text='Текст поста ' * 40,
+                image=SimpleUploadedFile(f'{number}.jpg', buffer.getvalue()),
+            )
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    page_obj = paginator_page(Post.objects.for_feed(), request)
+    list(page_obj)
+
+    def render():
+        render_to_string(
+            'posts/index.html', {'page_obj': page_obj}, request=request
+        )
+    # Первый рендер создаёт миниатюры и прогревает кеши.
+    render()
+    median, best = timed(render, repeat)
+    print(median, best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--child', nargs=2, metavar=('DIR', 'MODE'))
+    args = parser.parse_args()
+    if args.child:
+        run(*args.child, args.repeat)
+        return
+    print(f'{"fragments":>10} {"median, ms":>11} {"best, ms":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('off', 'warm'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_post_card',
+                 '--repeat', str(args.repeat), '--child', directory, mode],
+                cwd=BASE_DIR, check=True, capture_output=True, text=True,
+            ).stdout.split()
+            median, best = (float(value) * 1000 for value in output[-2:])
+            print(f'{mode:>10} {median:>11.2f} {best:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Страница поста в зависимости от числа комментариев к нему.
+
+Для постов с разным числом комментариев замеряются время страницы
+post_detail, число запросов и размер ответа.
+
+    python -m benchmarks.bench_post_comments
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import setup_django, timed
+
+COMMENTS = (10, 1000, 10000)
+
+
+def seed():
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Comment, Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='bench')
+    User.objects.bulk_create(
+        User(username=f'reader_{number}') for number in range(1000)
+    )
+    readers = list(User.objects.filter(username__startswith='reader_'))
+    posts = []
+    for count in COMMENTS:
+        post = Post.objects.create(author=author, text=f'{count} комментариев')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=readers[number % len(readers)],
+                    text='Текст комментария ' * 5)
+            for number in range(count)
+        )
+        posts.append((count, post))
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        run(seed(), args.repeat)
+
+
+def run(posts, repeat):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    print(f'{"комментариев":>12} {"ms":>9} {"запросов":>9} {"КБ":>7}')
+    for count, post in posts:
+        url = f'/posts/{post.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        queries = len(context.captured_queries)
+        elapsed, _ = timed(lambda: client.get(url), repeat)
+        print(f'{count:>12} {elapsed * 1000:>9.1f} '
+              f'{queries:>9} '
+              f'{len(response.content) / 1024:>7.1f}')
+
+
+if __name__ == '__main__':
+    main()
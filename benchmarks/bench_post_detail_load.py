@@ -0,0 +1,188 @@
+"""Нагрузочный тест страницы поста: задержки p50/p99 под конкурентной
+нагрузкой.
+
+Сервер разработки Django запускается в отдельном процессе на временной
+базе, клиенты в нескольких потоках запрашивают страницы случайных
+постов по HTTP. У каждого поста есть группа и несколько комментариев.
+
+SQLite отвечает из того же процесса, поэтому --db-latency добавляет
+к каждому запросу к базе задержку сетевого обмена с сервером СУБД.
+
+    python -m benchmarks.bench_post_detail_load --clients 8
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.utils import BASE_DIR, percentile, setup_django
+
+COMMENTS_PER_POST = 5
+
+
+def seed(posts):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Comment, Group, Post, UserStats
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'bench_{number}') for number in range(100)
+    )
+    users = list(User.objects.filter(username__startswith='bench_'))
+    UserStats.objects.bulk_create(UserStats(user=user) for user in users)
+    group = Group.objects.create(
+        title='Группа', slug='bench', description='Описание'
+    )
+    Post.objects.bulk_create(
+        Post(author=users[number % len(users)], group=group,
+             text='Текст поста для нагрузочного теста. ' * 5)
+        for number in range(posts)
+    )
+    Comment.objects.bulk_create(
+        Comment(post_id=post_id, author=users[number % len(users)],
+                text='Комментарий')
+        for post_id in Post.objects.values_list('id', flat=True)
+        for number in range(COMMENTS_PER_POST)
+    )
+
+
+def serve(db_path, port, db_latency):
+    """Процесс сервера: runserver без автоперезагрузки на базе db_path."""
+    setup_django(db_path, migrate=False)
+    from django.db.backends.signals import connection_created
+
+    def round_trip(execute, sql, params, many, context):
+        time.sleep(db_latency)
+        return execute(sql, params, many, context)
+
+    def add_latency(connection, **kwargs):
+        # Соединение переоткрывается на каждом запросе, а обёртки
+        # остаются у того же объекта DatabaseWrapper.
+        if round_trip not in connection.execute_wrappers:
+            connection.execute_wrappers.append(round_trip)
+
+    if db_latency:
+        connection_created.connect(add_latency, weak=False)
+    from django.core.servers.basehttp import (
+        WSGIRequestHandler, WSGIServer, run,
+    )
+    from django.core.wsgi import get_wsgi_application
+
+    class Server(WSGIServer):
+        def get_request(self):
+            # Заголовки и тело ответа уходят разными send(): без
+            # TCP_NODELAY каждый ответ ждёт отложенного ACK клиента.
+            sock, address = super().get_request()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return sock, address
+
+    WSGIRequestHandler.log_message = lambda *args: None
+    run('127.0.0.1', port, get_wsgi_application(), threading=True,
+        server_cls=Server)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('Сервер не запустился')
+
+
+def load(port, post_ids, clients, requests):
+    """Задержки в секундах для clients потоков по requests запросов."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(seed):
+        generator = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            connection.request(
+                'GET', f'/posts/{generator.choice(post_ids)}/'
+            )
+            response = connection.getresponse()
+            response.read()
+            samples.append(time.perf_counter() - started)
+            if response.status != 200:
+                raise RuntimeError(f'Ответ {response.status}')
+            if response.getheader('Connection') == 'close':
+                connection.close()
+        with lock:
+            latencies.extend(samples)
+
+    threads = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--db-latency', type=float, default=1.0,
+                        help='задержка запроса к базе, ms')
+    parser.add_argument('--serve', nargs=2, metavar=('DB', 'PORT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]), args.db_latency / 1000)
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'bench.sqlite3')
+        setup_django(db_path)
+        seed(args.posts)
+        from posts.models import Post
+        post_ids = list(Post.objects.values_list('id', flat=True))
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.bench_post_detail_load',
+             '--serve', db_path, str(port),
+             '--db-latency', str(args.db_latency)],
+            cwd=BASE_DIR,
+        )
+        try:
+            wait_for(port)
+            # Прогрев: импорт шаблонов и первые соединения с базой.
+            load(port, post_ids, 1, 20)
+            latencies, elapsed = load(
+                port, post_ids, args.clients, args.requests
+            )
+        finally:
+            server.terminate()
+            server.wait()
+    print(f'клиентов: {args.clients}, запросов: {len(latencies)}, '
+          f'задержка базы: {args.db_latency} ms')
+    print(f'p50 {percentile(latencies, 0.5) * 1000:.1f} ms, '
+          f'p99 {percentile(latencies, 0.99) * 1000:.1f} ms, '
+          f'{len(latencies) / elapsed:.0f} запросов/с')
+
+
+if __name__ == '__main__':
+    main()
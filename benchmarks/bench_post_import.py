@@ -0,0 +1,87 @@
+"""Импорт постов по одному и пачками.
+
+Файл JSON Lines из --rows постов 10 авторов (половина — в группе)
+импортируется через posts.imports с разными размерами пачки. Для
+сравнения первые --single строк создаются по одной через
+Post.objects.create, как при публикации из формы. Выводится скорость
+в строках в секунду, включая пересчёт счётчиков и лент после импорта.
+
+    python -m benchmarks.bench_post_import --rows 100000
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.utils import setup_django
+
+BATCH_SIZES = (100, 1000, 5000)
+
+
+def write_rows(path, count, authors=10):
+    with open(path, 'w', encoding='utf-8') as file:
+        for number in range(count):
+            file.write(json.dumps({
+                'text': f'Импортированный пост номер {number}. ' * 5,
+                'author': f'bench_{number % authors}',
+                'group': 'bench' if number % 2 else '',
+                'pub_date': f'2020-01-01T00:00:{number % 60:02}',
+            }, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single', type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        from django.contrib.auth import get_user_model
+
+        from posts import follows, imports
+        from posts.models import Group, Post
+
+        User = get_user_model()
+        users = [User.objects.create_user(username=f'bench_{number}')
+                 for number in range(10)]
+        group = Group.objects.create(title='Группа', slug='bench')
+        # Подписчики, чтобы импорт пересобирал их ленты.
+        for number in range(100):
+            reader = User.objects.create_user(username=f'reader_{number}')
+            follows.follow(reader.pk, users[number % len(users)].pk)
+        path = os.path.join(directory, 'posts.jsonl')
+        write_rows(path, args.rows)
+
+        print(f'{"способ":>14} {"строк":>8} {"с":>7} {"строк/с":>9}')
+        with open(path, encoding='utf-8') as file:
+            rows = list(itertools.islice(
+                imports.parse(imports.records(file, 'jsonl'), print),
+                args.single,
+            ))
+        authors = {user.username: user for user in users}
+        started = time.perf_counter()
+        for row in rows:
+            Post.objects.create(
+                text=row.text, author=authors[row.author],
+                group=group if row.group else None,
+            )
+        elapsed = time.perf_counter() - started
+        print(f'{"create":>14} {len(rows):>8} {elapsed:>7.2f} '
+              f'{len(rows) / elapsed:>9.0f}')
+        for batch_size in BATCH_SIZES:
+            Post.objects.all().delete()
+            started = time.perf_counter()
+            with open(path, encoding='utf-8') as file:
+                imported = imports.import_posts(
+                    imports.parse(imports.records(file, 'jsonl'), print),
+                    batch_size=batch_size,
+                )
+            elapsed = time.perf_counter() - started
+            print(f'{f"пачки по {batch_size}":>14} {imported:>8} '
+                  f'{elapsed:>7.2f} {imported / elapsed:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Поиск по постам: индекс FTS5 против LIKE '%слово%'.
+
+Посты состоят из случайных слов словаря с распределением Ципфа, поэтому
+есть частые слова (LIKE быстро набирает первую страницу) и редкие
+(LIKE просматривает всю таблицу). Для каждого запроса замеряется первая
+страница из 10 постов.
+
+    python -m benchmarks.bench_search --posts 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import tempfile
+
+from benchmarks.utils import setup_django, timed
+
+VOCABULARY = 20000
+WORDS_PER_POST = 30
+BATCH = 10000
+
+
+def word(rank):
+    return f'слово{rank}'
+
+
+def seed(count):
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Post
+
+    User = get_user_model()
+    author = User.objects.create_user(username='bench')
+    generator = random.Random(0)
+    words = [word(rank) for rank in range(1, VOCABULARY + 1)]
+    cum_weights = list(itertools.accumulate(
+        1 / rank for rank in range(1, VOCABULARY + 1)
+    ))
+    created = 0
+    while created < count:
+        size = min(BATCH, count - created)
+        chosen = generator.choices(
+            words, cum_weights=cum_weights, k=size * WORDS_PER_POST
+        )
+        Post.objects.bulk_create(
+            Post(
+                author=author,
+                text=' '.join(chosen[start:start + WORDS_PER_POST]),
+            )
+            for start in range(0, len(chosen), WORDS_PER_POST)
+        )
+        created += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        seed(args.posts)
+        run(args.repeat)
+
+
+def run(repeat):
+    from django.db import connection
+
+    from posts.models import Post
+    from posts.search import FTS_TABLE, SearchPaginator, match_query
+
+    queries = (
+        ('частое', word(1)),
+        ('среднее', word(100)),
+        ('редкое', word(VOCABULARY)),
+        ('два слова', f'{word(2)} {word(50)}'),
+    )
+    print(f'{"запрос":>10} {"найдено":>9} {"LIKE, ms":>9} {"FTS5, ms":>9} '
+          f'{"FTS5 стр. 2, ms":>15}')
+    for title, query in queries:
+        def like():
+            posts = Post.objects.all()
+            for term in query.split():
+                posts = posts.filter(text__icontains=term)
+            return list(posts.order_by('-pub_date', '-id')[:10])
+
+        paginator = SearchPaginator(query, 10)
+        paginator.get_page()
+        cursor = paginator.next_cursor
+
+        like_time, _ = timed(like, repeat)
+        fts_time, _ = timed(
+            lambda: SearchPaginator(query, 10).get_page(), repeat
+        )
+        next_time, _ = timed(
+            lambda: SearchPaginator(query, 10).get_page(cursor=cursor),
+            repeat,
+        )
+        with connection.cursor() as db:
+            db.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [match_query(query)],
+            )
+            found = db.fetchone()[0]
+        print(f'{title:>10} {found:>9} {like_time * 1000:>9.1f} '
+              f'{fts_time * 1000:>9.1f} {next_time * 1000:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
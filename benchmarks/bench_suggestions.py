@@ -0,0 +1,85 @@
+"""Рекомендации «Кого читать» на синтетическом графе подписок.
+
+Граф из --users пользователей и примерно --edges подписок строится
+в памяти (популярность авторов распределена неравномерно: чем меньше
+id, тем больше подписчиков). Выводятся время и пик памяти построения
+CSR-матриц и время расчёта рекомендаций для --sample пользователей.
+
+    python -m benchmarks.bench_suggestions --edges 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.utils import setup_django
+
+
+def synthetic_edges(users, edges, seed=1):
+    """Рёбра (user_id, author_id), упорядоченные по user_id."""
+    rng = random.Random(seed)
+    per_user = edges // users
+    for user_id in range(1, users + 1):
+        authors = {1 + int(users * rng.random() ** 2)
+                   for _ in range(rng.randint(1, 2 * per_user - 1))}
+        authors.discard(user_id)
+        for author_id in sorted(authors):
+            yield user_id, author_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=1000000)
+    parser.add_argument('--sample', type=int, default=10000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'), migrate=False)
+        from django.conf import settings
+
+        from posts.suggestions import FollowGraph
+
+        edges = list(synthetic_edges(args.users, args.edges))
+        started = time.perf_counter()
+        graph = FollowGraph(edges, args.users + 1)
+        built = time.perf_counter() - started
+        # Память меряется отдельным построением: tracemalloc замедляет
+        # его в несколько раз.
+        tracemalloc.start()
+        graph = FollowGraph(edges, args.users + 1)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del edges
+        print(f'подписок: {len(graph.authors)}, '
+              f'пользователей: {args.users}')
+        print(f'построение: {built:.2f} с, граф {current / 2 ** 20:.1f} МБ, '
+              f'пик {peak / 2 ** 20:.1f} МБ')
+
+        users = random.Random(2).sample(
+            range(1, args.users + 1), min(args.sample, args.users)
+        )
+
+        def suggest_all():
+            for user_id in users:
+                graph.suggest(
+                    user_id, settings.SUGGESTIONS_COUNT,
+                    settings.SUGGESTIONS_SIMILAR_USERS,
+                )
+
+        started = time.perf_counter()
+        suggest_all()
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        suggest_all()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'рекомендации: {elapsed / len(users) * 1000:.2f} мс '
+              f'на пользователя, все {args.users} — '
+              f'около {elapsed / len(users) * args.users:.0f} с, '
+              f'пик {peak / 2 ** 20:.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Обращения к кешу и базе при поиске миниатюр страницы ленты.
+
+Кеш карточек отключён, чтобы каждая карточка искала миниатюру заново.
+``tag`` — как раньше: каждый {% thumbnail %} идёт в KV-хранилище sorl
+(кеш, а при промахе кеша ещё и база). ``tag, cold`` — то же после
+сброса кеша, когда KV-записи читаются из базы. ``page`` — адреса всей
+страницы берутся одним get_many через posts.thumbnails.attach_urls.
+
+    python -m benchmarks.bench_thumbnail_lookup
+"""
+import argparse
+import os
+import tempfile
+from collections import Counter
+
+from benchmarks.utils import setup_django, timed
+
+DUMMY = 'django.core.cache.backends.dummy.DummyCache'
+SQLITE = 'core.cache_backends.sqlite.SQLiteCache'
+CACHE_METHODS = ('get', 'get_many', 'set', 'set_many', 'add', 'delete')
+
+
+def count_cache_calls(cache, counter):
+    """Подменяет методы кеша обёртками, считающими вызовы."""
+    for name in CACHE_METHODS:
+        method = getattr(cache, name)
+
+        def counted(*args, _name=name, _method=method, **kwargs):
+            counter[_name] += 1
+            return _method(*args, **kwargs)
+        setattr(cache, name, counted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        caches = {
+            'default': {
+                'BACKEND': SQLITE,
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+                'OPTIONS': {'MAX_ENTRIES': 10 ** 6},
+            },
+            'template_fragments': {'BACKEND': DUMMY},
+        }
+        setup_django(os.path.join(directory, 'bench.sqlite3'), caches=caches)
+        from django.conf import settings
+        settings.MEDIA_ROOT = os.path.join(directory, 'media')
+        settings.THUMBNAIL_WORKERS = 0
+        run(args.repeat)
+
+
+def run(repeat):
+    from io import BytesIO
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.cache import cache
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.db import connection
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from PIL import Image
+
+    from core.utils.paginate_page import paginator_page
+    from posts import thumbnails
+    from posts.models import Post, User
+
+    author = User.objects.create_user(username='author')
+    for number in range(10):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 1200), (number * 20, 80, 160)).save(
+            buffer, 'JPEG'
+        )
+        Post.objects.create(
+            author=author, text='Текст поста ' * 40,
+            image=SimpleUploadedFile(f'{number}.jpg', buffer.getvalue()),
+        )
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+
+    def render(attach):
+        page_obj = paginator_page(Post.objects.for_feed(), request)
+        list(page_obj)
+        if attach:
+            thumbnails.attach_urls(page_obj)
+        render_to_string(
+            'posts/index.html', {'page_obj': page_obj}, request=request
+        )
+
+    counter = Counter()
+    count_cache_calls(cache, counter)
+    modes = (
+        ('tag', False, False),
+        ('tag, cold', False, True),
+        ('page', True, False),
+    )
+    print(f'{"mode":>10} {"cache calls":>12} {"queries":>8} '
+          f'{"median, ms":>11}')
+    for title, attach, cold in modes:
+        render(attach)
+        if cold:
+            cache.clear()
+        counter.clear()
+        with CaptureQueriesContext(connection) as queries:
+            render(attach)
+        calls = sum(counter.values())
+        # Запрос страницы постов одинаков во всех режимах.
+        extra_queries = len(queries) - 1
+
+        def timed_render():
+            if cold:
+                cache.clear()
+            render(attach)
+        median, _ = timed(timed_render, repeat)
+        print(f'{title:>10} {calls:>12} {extra_queries:>8} '
+              f'{median * 1000:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Рейтинг популярных постов за час и сутки.
+
+Сравнивает группировку таблицы комментариев за окно на каждый запрос
+(``comments``), полный расчёт по счётчикам интервалов TrendBucket
+(``buckets``), инкрементальный пересчёт при сдвиге окна на интервал
+(``refresh``) и закешированный рейтинг (``cached``). Комментарии
+равномерно распределены по последним суткам.
+
+    python -m benchmarks.bench_trending --comments 1000000
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks.utils import seed_posts, setup_django, timed
+
+
+def seed_comments(count, posts, batch_size=10000):
+    """Создаёт count комментариев к первым posts постам за сутки и
+    счётчики интервалов по ним."""
+    from django.conf import settings
+    from django.db import connection
+
+    from posts.models import Comment, Post, User
+
+    post_ids = list(Post.objects.values_list('pk', flat=True)[:posts])
+    author = User.objects.first()
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        Comment.objects.bulk_create(
+            Comment(post_id=post_ids[(created + i) * 7 % len(post_ids)],
+                    author=author, text='Комментарий')
+            for i in range(size)
+        )
+        created += size
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE posts_comment SET created = "
+            "datetime('now', '-' || (id * 86399 / %s) || ' seconds')",
+            [count],
+        )
+        cursor.execute(
+            "INSERT INTO posts_trendbucket (kind, object_id, bucket, count) "
+            "SELECT 'post', post_id, "
+            "CAST(strftime('%%s', created) AS INTEGER) / %s, COUNT(*) "
+            "FROM posts_comment GROUP BY 2, 3",
+            [settings.TRENDING_BUCKET_SECONDS],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, 'bench.sqlite3'))
+        from django.conf import settings
+        from django.core.cache import cache
+        from django.db.models import Count
+        from django.utils import timezone
+
+        from posts import trending
+        from posts.models import Comment, TrendBucket
+
+        seed_posts(args.posts)
+        seed_comments(args.comments, args.posts)
+        print(f'{"окно":>6} {"способ":>9} {"медиана, ms":>12} '
+              f'{"лучшее, ms":>11}')
+        for window, seconds in trending.WINDOWS.items():
+            since = timezone.now() - timedelta(seconds=seconds)
+
+            def comments():
+                return list(
+                    Comment.objects.filter(created__gte=since)
+                    .values('post').annotate(total=Count('pk'))
+                    .order_by('-total').values_list('post', 'total')[:10]
+                )
+
+            def buckets():
+                return trending.ranking(TrendBucket.POST, window)
+
+            moments = itertools.count(
+                time.time(), settings.TRENDING_BUCKET_SECONDS
+            )
+
+            def refresh():
+                return trending.refresh(
+                    TrendBucket.POST, window, next(moments)
+                )
+
+            def cached():
+                return trending.top(TrendBucket.POST, window)
+
+            cache.clear()
+            refresh()
+            for name, func in (('comments', comments), ('buckets', buckets),
+                               ('refresh', refresh), ('cached', cached)):
+                median, best = timed(func, args.repeat)
+                print(f'{window:>6} {name:>9} {median * 1000:>12.2f} '
+                      f'{best * 1000:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Общая подготовка окружения для бенчмарков.
+
+Бенчмарки запускаются из корня репозитория, например::
+
+    python -m benchmarks.bench_index_memory
+
+Каждый работает с отдельной временной базой SQLite и локальным кешем,
+чтобы не трогать db.sqlite3 проекта.
+"""
+import os
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(BASE_DIR, 'yatube')
+
+
+def setup_django(db_path, migrate=True, caches=None):
+    """Настраивает Django на базу db_path и применяет миграции."""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.CACHES = caches or {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10 ** 6},
+        }
+    }
+    settings.DEBUG = False
+    import django
+    django.setup()
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def timed(func, repeat=5):
+    """Время выполнения func в секундах: (медиана, минимум)."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), min(samples)
+
+
+def percentile(samples, fraction):
+    """Перцентиль по отсортированной выборке."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_posts(count, authors=10, text_size=200, batch_size=5000):
+    """Создаёт count постов от authors авторов пачками bulk_create."""
+    from django.contrib.auth import get_user_model
+    from posts.models import Post
+
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        User(username=f'bench_{number}') for number in range(authors)
+    )
+    users = list(User.objects.filter(username__startswith='bench_'))
+    text = ('Текст поста для бенчмарка. ' * (text_size // 27 + 1))
+    text = text[:text_size]
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        Post.objects.bulk_create(
+            Post(text=text, author=users[(created + i) % len(users)])
+            for i in range(size)
+        )
+        created += size
+    return users
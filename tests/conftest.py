@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,30 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_storage(tmp_path_factory):
+    # Кеш и загруженные файлы тестов — во временном каталоге, а не рядом
+    # с данными работающего сервера. Миниатюры создаются без фоновых
+    # процессов: те не видят тестовой базы и настроек.
+    from django.conf import settings
+    from django.test import override_settings
+
+    directory = tmp_path_factory.mktemp('yatube')
+    caches = {'default': {**settings.CACHES['default'],
+                          'LOCATION': str(directory / 'cache.sqlite3')}}
+    with override_settings(CACHES=caches, MEDIA_ROOT=str(directory / 'media'),
+                           THUMBNAIL_WORKERS=0):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def commit_immediately(monkeypatch):
+    # Тест идёт в транзакции, которая не фиксируется, поэтому обработчики
+    # on_commit (сброс кешей страниц) выполняются сразу.
+    from django.db import transaction
+
+    monkeypatch.setattr(
+        transaction, 'on_commit', lambda func, using=None: func()
+    )
@@ -0,0 +1,322 @@
+"""Кеш в файле SQLite, общий для всех процессов одного хоста.
+
+LocMemCache у каждого воркера свой: одна и та же страница рендерится
+в каждом воркере и занимает память в каждом. Здесь записи лежат в одном
+файле в режиме WAL: читатели не блокируют друг друга и писателя,
+а писатели выстраиваются в очередь на блокировке файла.
+
+Размер кеша ограничен числом записей MAX_ENTRIES и объёмом MAX_SIZE
+в байтах. Итоги хранятся в отдельной строке и поддерживаются триггерами,
+поэтому проверка переполнения не сканирует таблицу. При переполнении
+сначала удаляются истёкшие записи, затем давно не читавшиеся (LRU) —
+так, чтобы освободить 1/CULL_FREQUENCY лимита. Истёкшие записи при
+чтении просто не возвращаются и удаляются при очередном вытеснении.
+Время чтения обновляется не чаще раза в ACCESS_RESOLUTION секунд,
+чтобы чтения горячих ключей не превращались в запись на каждый запрос.
+
+Целые числа хранятся как INTEGER, поэтому incr — один атомарный UPDATE.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Ограничение SQLite на число параметров запроса в старых версиях — 999.
+MAX_PARAMS = 500
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed'
+    ' ON cache_entry (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_totals ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' entries INTEGER NOT NULL,'
+    ' bytes INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_totals VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_insert'
+    ' AFTER INSERT ON cache_entry BEGIN'
+    ' UPDATE cache_totals'
+    ' SET entries = entries + 1, bytes = bytes + NEW.size;'
+    ' END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_delete'
+    ' AFTER DELETE ON cache_entry BEGIN'
+    ' UPDATE cache_totals'
+    ' SET entries = entries - 1, bytes = bytes - OLD.size;'
+    ' END',
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_resize'
+    ' AFTER UPDATE OF size ON cache_entry BEGIN'
+    ' UPDATE cache_totals SET bytes = bytes - OLD.size + NEW.size;'
+    ' END',
+)
+
+UPSERT = (
+    'INSERT INTO cache_entry (key, value, expires, accessed, size)'
+    ' VALUES (?, ?, ?, ?, ?)'
+    ' ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+    ' expires = excluded.expires, accessed = excluded.accessed,'
+    ' size = excluded.size'
+)
+
+# Удаляет самые давно читавшиеся записи, пока не наберётся нужное
+# число записей и байтов.
+CULL = (
+    'DELETE FROM cache_entry WHERE key IN ('
+    ' SELECT key FROM ('
+    '  SELECT key, size,'
+    '  ROW_NUMBER() OVER (ORDER BY accessed, key) AS position,'
+    '  SUM(size) OVER (ORDER BY accessed, key) AS freed'
+    '  FROM cache_entry)'
+    ' WHERE position <= ? OR freed - size < ?)'
+)
+
+
+def _chunks(items, size=MAX_PARAMS):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _encode(value):
+    if type(value) is int and MIN_INTEGER <= value <= MAX_INTEGER:
+        return value, 8
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    return sqlite3.Binary(data), len(data)
+
+
+def _decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite с LRU-вытеснением и ограничением объёма.
+
+    LOCATION — путь к файлу. Соединения открываются по одному на поток
+    и заново после fork, поэтому бэкенд безопасен для воркеров gunicorn
+    с preload.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._location = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 5))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 10))
+        self._local = threading.local()
+
+    def _connect(self):
+        directory = os.path.dirname(self._location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._location, timeout=self._busy_timeout, isolation_level=None
+        )
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with self._transaction(connection):
+            for statement in SCHEMA:
+                connection.execute(statement)
+        return connection
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # Соединение, унаследованное от родителя через fork,
+            # использовать нельзя.
+            local.connection = self._connect()
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self, connection=None):
+        """Транзакция с блокировкой на запись с самого начала."""
+        connection = connection or self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (now,)
+        )
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        keep_entries = self._max_entries
+        keep_size = self._max_size
+        if self._cull_frequency:
+            keep_entries -= self._max_entries // self._cull_frequency
+            keep_size -= self._max_size // self._cull_frequency
+        else:
+            keep_entries = keep_size = 0
+        connection.execute(
+            CULL, (entries - keep_entries, size - keep_size)
+        )
+
+    def _store(self, items, timeout, only_new=False):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        stored = []
+        with self._transaction() as connection:
+            for key, value in items:
+                if only_new and connection.execute(
+                    'SELECT 1 FROM cache_entry WHERE key = ?'
+                    ' AND (expires IS NULL OR expires > ?)', (key, now)
+                ).fetchone():
+                    continue
+                if expires is not None and expires <= now:
+                    connection.execute(
+                        'DELETE FROM cache_entry WHERE key = ?', (key,)
+                    )
+                    continue
+                data, size = _encode(value)
+                connection.execute(
+                    UPSERT, (key, data, expires, now, size + len(key))
+                )
+                stored.append(key)
+            self._cull(connection, now)
+        return stored
+
+    def _touch_accessed(self, keys, now):
+        if not keys:
+            return
+        with self._transaction() as connection:
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'UPDATE cache_entry SET accessed = ? WHERE key IN (%s)'
+                    % ', '.join('?' * len(chunk)), [now, *chunk]
+                )
+
+    def _fetch(self, keys):
+        """Живые значения по ключам, обновляя время чтения LRU."""
+        now = time.time()
+        found = {}
+        stale = []
+        connection = self._connection()
+        for chunk in _chunks(keys):
+            rows = connection.execute(
+                'SELECT key, value, expires, accessed FROM cache_entry'
+                ' WHERE key IN (%s)' % ', '.join('?' * len(chunk)), chunk
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = _decode(value)
+                if now - accessed >= self._access_resolution:
+                    stale.append(key)
+        self._touch_accessed(stale, now)
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return bool(self._store([(key, value)], timeout, only_new=True))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store([(self._key(key, version), value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            return connection.execute(
+                'UPDATE cache_entry SET expires = ? WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            return connection.execute(
+                'DELETE FROM cache_entry WHERE key = ?', (key,)
+            ).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        alive = 'key = ? AND (expires IS NULL OR expires > ?)'
+        with self._transaction() as connection:
+            updated = connection.execute(
+                'UPDATE cache_entry SET value = value + ?, accessed = ?'
+                f' WHERE {alive} AND typeof(value) = \'integer\'',
+                (delta, now, key, now),
+            ).rowcount
+            row = connection.execute(
+                f'SELECT value FROM cache_entry WHERE {alive}', (key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            if updated:
+                return row[0]
+            # Не целое значение: складываем в Python под той же блокировкой.
+            value = _decode(row[0]) + delta
+            data, size = _encode(value)
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, size = ?, accessed = ?'
+                ' WHERE key = ?', (data, size + len(key), now, key)
+            )
+            return value
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(keys)
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store(
+            [(self._key(key, version), value) for key, value in data.items()],
+            timeout,
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            for chunk in _chunks(keys):
+                connection.execute(
+                    'DELETE FROM cache_entry WHERE key IN (%s)'
+                    % ', '.join('?' * len(chunk)), chunk
+                )
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entry')
@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.utils.page_cache import cache_stats
+
+PAGE_PREFIXES = ('index_page', 'group_page', 'profile_page')
+
+
+class Command(BaseCommand):
+    """Статистика кеша страниц для мониторинга."""
+
+    help = 'Выводит в JSON число попаданий и промахов кеша страниц.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'prefixes', nargs='*', default=PAGE_PREFIXES,
+            help='Префиксы страниц, по умолчанию все ленты.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(cache_stats(*options['prefixes'])))
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache_backends.sqlite import SQLiteCache
+
+WORKERS = 4
+INCREMENTS = 200
+
+
+def _make_cache(location, **options):
+    return SQLiteCache(location, {'OPTIONS': options})
+
+
+def _increment(location):
+    cache = _make_cache(location)
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+def _render_once(location, number):
+    cache = _make_cache(location)
+    if cache.add('page', f'рендер {number}'):
+        cache.incr('renders')
+    cache.set(f'seen:{number}', cache.get('page'))
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = _make_cache(self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Запись, чтение, add, incr, удаление и истечение срока."""
+        cache = self.cache
+        cache.set('post', {'text': 'Тестовый пост'})
+        self.assertEqual(cache.get('post'), {'text': 'Тестовый пост'})
+        self.assertFalse(cache.add('post', 'другое значение'))
+        self.assertTrue(cache.add('new', 1))
+        self.assertEqual(cache.incr('new', 5), 6)
+        self.assertEqual(cache.decr('new'), 5)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': [2]}
+        )
+        cache.delete_many(['a', 'b'])
+        self.assertIsNone(cache.get('a'))
+        cache.set('short', 'значение', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('short'))
+        self.assertFalse(cache.has_key('short'))
+        self.assertTrue(cache.add('short', 'снова'))
+        cache.clear()
+        self.assertIsNone(cache.get('post'))
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = _make_cache(
+            self.location, MAX_ENTRIES=10, CULL_FREQUENCY=2,
+            ACCESS_RESOLUTION=0,
+        )
+        for number in range(10):
+            cache.set(f'key:{number}', number)
+        self.assertEqual(cache.get('key:0'), 0)
+        cache.set('key:10', 10)
+        self.assertEqual(cache.get('key:0'), 0)
+        self.assertEqual(cache.get('key:10'), 10)
+        self.assertIsNone(cache.get('key:1'))
+        self.assertEqual(len(cache.get_many(
+            [f'key:{number}' for number in range(11)]
+        )), 5)
+
+    def test_size_cap(self):
+        """Объём кеша не превышает MAX_SIZE."""
+        cache = _make_cache(self.location, MAX_SIZE=10000)
+        for number in range(20):
+            cache.set(f'page:{number}', 'x' * 1000)
+        connection = cache._connection()
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_totals'
+        ).fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertEqual(entries, connection.execute(
+            'SELECT COUNT(*) FROM cache_entry'
+        ).fetchone()[0])
+        self.assertIsNotNone(cache.get('page:19'))
+
+    def _run(self, target, numbered=False):
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=target,
+                args=(self.location, number) if numbered else (self.location,)
+            )
+            for number in range(WORKERS)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            self.assertEqual(process.exitcode, 0)
+
+    def test_concurrent_increments(self):
+        """incr из нескольких процессов не теряет обновлений."""
+        self.cache.set('counter', 0)
+        self._run(_increment)
+        self.assertEqual(self.cache.get('counter'), WORKERS * INCREMENTS)
+
+    def test_entries_shared_between_processes(self):
+        """Запись одного процесса видна остальным: страница рендерится
+        один раз на хост, а не в каждом воркере."""
+        self.cache.set('renders', 0)
+        self._run(_render_once, numbered=True)
+        self.assertEqual(self.cache.get('renders'), 1)
+        page = self.cache.get('page')
+        self.assertEqual(
+            self.cache.get_many([f'seen:{n}' for n in range(WORKERS)]),
+            {f'seen:{n}': page for n in range(WORKERS)},
+        )
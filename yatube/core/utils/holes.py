@@ -0,0 +1,54 @@
+"""Дыры в кешированных страницах для данных конкретного посетителя.
+
+Части страницы, которые зависят от посетителя (шапка с именем
+пользователя, кнопки подписки, CSRF-токены), выводятся тегом
+{% hole %}. Пока view рендерит страницу для кеша, тег оставляет
+вместо фрагмента метку-комментарий, и тело страницы не обращается
+к сессии, поэтому одно закешированное тело подходит всем посетителям.
+При ответе метки заменяются фрагментами, отрендеренными для текущего
+запроса. Вне таких страниц тег рендерит фрагмент на месте.
+"""
+import json
+import re
+
+from django.template.loader import render_to_string
+
+HOLE = re.compile(r'<!--hole:(.*?)-->')
+CONTEXTS = {}
+
+
+def hole_context(template_name):
+    """Регистрирует функцию контекста фрагмента template_name.
+
+    Функция получает запрос и аргументы тега и возвращает словарь
+    контекста. Без неё фрагмент рендерится с аргументами тега.
+    """
+    def decorator(func):
+        CONTEXTS[template_name] = func
+        return func
+    return decorator
+
+
+def render_hole(request, template_name, kwargs):
+    """Рендерит фрагмент для текущего запроса."""
+    get_context = CONTEXTS.get(template_name)
+    context = get_context(request, **kwargs) if get_context else kwargs
+    return render_to_string(template_name, context, request=request)
+
+
+def placeholder(template_name, kwargs):
+    """Метка фрагмента в кешируемом теле страницы.
+
+    Аргументы должны сериализоваться в JSON. Символ > экранируется,
+    чтобы значение не закрыло комментарий раньше времени.
+    """
+    data = json.dumps([template_name, kwargs]).replace('>', '\\u003e')
+    return f'<!--hole:{data}-->'
+
+
+def splice(request, content):
+    """Заменяет метки в content фрагментами для текущего запроса."""
+    def fill(match):
+        template_name, kwargs = json.loads(match.group(1))
+        return render_hole(request, template_name, kwargs)
+    return HOLE.sub(fill, content)
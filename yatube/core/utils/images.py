@@ -0,0 +1,73 @@
+"""Нормализация загружаемых картинок.
+
+Картинка уменьшается до max_size пикселей по большей стороне,
+поворачивается по EXIF Orientation, теряет EXIF и перекодируется
+в прогрессивный JPEG. Исходный файл читается потоком: для JPEG декодер
+сразу работает в уменьшенном масштабе (draft), а уменьшение и поворот
+выполняются на месте, поэтому в памяти не бывает нескольких полных
+декодированных копий большой фотографии.
+"""
+import os
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+TRANSPOSE = {
+    2: Image.FLIP_LEFT_RIGHT,
+    3: Image.ROTATE_180,
+    4: Image.FLIP_TOP_BOTTOM,
+    5: Image.TRANSPOSE,
+    6: Image.ROTATE_270,
+    7: Image.TRANSVERSE,
+    8: Image.ROTATE_90,
+}
+BACKGROUND = (255, 255, 255)
+
+
+def _fit(size, max_size):
+    # draft уменьшает масштаб, только пока обе стороны не меньше
+    # запрошенных, поэтому запрашиваем итоговый размер с пропорциями.
+    width, height = size
+    ratio = min(max_size / width, max_size / height, 1)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def _to_rgb(image):
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA', 'P', 'PA'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, BACKGROUND)
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def normalize_image(uploaded, max_size, quality):
+    """Уменьшенная копия загруженной картинки в прогрессивном JPEG."""
+    uploaded.seek(0)
+    try:
+        image = Image.open(uploaded)
+        orientation = image.getexif().get(EXIF_ORIENTATION)
+        icc_profile = image.info.get('icc_profile')
+        image.draft('RGB', _fit(image.size, max_size))
+        image.thumbnail(
+            (max_size, max_size), Image.LANCZOS, reducing_gap=None
+        )
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ValidationError(f'Не удалось обработать картинку: {error}')
+    if orientation in TRANSPOSE:
+        image = image.transpose(TRANSPOSE[orientation])
+    image = _to_rgb(image)
+    output = BytesIO()
+    image.save(
+        output, 'JPEG', quality=quality, progressive=True, optimize=True,
+        icc_profile=icc_profile,
+    )
+    name = os.path.splitext(os.path.basename(uploaded.name))[0] + '.jpg'
+    return InMemoryUploadedFile(
+        output, 'image', name, 'image/jpeg', output.tell(), None
+    )
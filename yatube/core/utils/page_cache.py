@@ -0,0 +1,166 @@
+"""Кеширование страниц с версионными ключами.
+
+Каждая область данных (посты, группы, подписки, пользователи) имеет
+счётчик поколения. Ключ закешированной страницы включает поколения
+областей, от которых она зависит, поэтому изменение данных сразу
+отправляет страницу в промах, а TTL может быть сколь угодно долгим.
+Те же поколения служат ETag для условных GET-запросов.
+
+Данные посетителя выводятся в страницу дырами (core.utils.holes),
+поэтому закешированное тело страницы одно на всех посетителей.
+"""
+import hashlib
+import time
+from functools import partial, wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from .holes import splice
+
+GENERATION_KEY = 'generation:{}'
+STATS_KEY = 'page_cache:{}:{}'
+HIT = 'hits'
+MISS = 'misses'
+
+
+def _initial_generation():
+    # Поколение, потерянное при вытеснении из кеша, начинается заново
+    # со времени в миллисекундах, чтобы не совпасть со старым значением.
+    return int(time.time() * 1000)
+
+
+def get_generations(*scopes):
+    """Текущие поколения областей одним чтением из кеша."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), None)
+            found[key] = cache.get(key)
+        generations.append(found[key])
+    return generations
+
+
+def bump_generation(*scopes):
+    """Начинает новое поколение областей, их страницы устаревают."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), None)
+
+
+def bump_generation_on_commit(*scopes, using=None):
+    """Начинает новое поколение областей после фиксации транзакции.
+
+    Если сменить поколение до фиксации, параллельный запрос успеет
+    закешировать под новым ключом страницу без незафиксированных
+    изменений. Вне транзакции поколение меняется сразу.
+    """
+    transaction.on_commit(partial(bump_generation, *scopes), using)
+
+
+def record(key_prefix, outcome):
+    """Учитывает попадание или промах кеша страниц key_prefix."""
+    key = STATS_KEY.format(key_prefix, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def cache_stats(*key_prefixes):
+    """Счётчики попаданий и промахов по префиксам страниц."""
+    keys = {
+        STATS_KEY.format(prefix, outcome): (prefix, outcome)
+        for prefix in key_prefixes for outcome in (HIT, MISS)
+    }
+    found = cache.get_many(keys)
+    stats = {prefix: {HIT: 0, MISS: 0} for prefix in key_prefixes}
+    for key, (prefix, outcome) in keys.items():
+        stats[prefix][outcome] = found.get(key, 0)
+    return stats
+
+
+def cache_page_versioned(timeout, key_prefix, scopes):
+    """Аналог cache_page, ключ которого включает поколения scopes."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            generations = '.'.join(map(str, get_generations(*scopes)))
+            cached_view = cache_page(
+                timeout, key_prefix=f'{key_prefix}.{generations}'
+            )(view)
+            response = cached_view(request, *args, **kwargs)
+            updated = getattr(request, '_cache_update_cache', None)
+            if request.method in ('GET', 'HEAD') and updated is not None:
+                record(key_prefix, MISS if updated else HIT)
+            return response
+        return wrapper
+    return decorator
+
+
+def punch_holes(view):
+    """Вставляет в ответ view фрагменты для текущего посетителя.
+
+    Ставится над cache_page_versioned: view и кеш работают с телом
+    страницы, в котором на месте тегов {% hole %} стоят метки, а метки
+    заполняются уже после кеша. Тело не обращается к сессии, поэтому
+    кеш хранит одну копию страницы для всех, а ответ, в который
+    вставлены данные посетителя, получает Vary: Cookie.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.punch_holes = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            # Страницы ошибок рендерятся вне view и дыр не оставляют.
+            request.punch_holes = False
+        if response.status_code == 200 and not response.streaming:
+            response.content = splice(
+                request, response.content.decode(response.charset)
+            )
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = len(response.content)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def page_etag(scopes, variant=None):
+    """Условный GET по ETag из поколений scopes, адреса и пользователя.
+
+    ETag вычисляется одним чтением из кеша без запросов к базе и без
+    рендеринга, поэтому повторный запрос с совпавшим If-None-Match
+    получает 304. Анонимные и авторизованные посетители, как и разные
+    пользователи, получают разные ETag: страницы отличаются шапкой
+    и кнопками.
+
+    В ETag авторизованного пользователя входит и его CSRF-токен: формы
+    страницы содержат токен, а после нового входа он другой, и старая
+    копия страницы отправила бы форму с устаревшим токеном.
+
+    variant(request) — данные авторизованного посетителя, от которых
+    ещё зависит страница (например, его подписки для кнопок подписки).
+    """
+    def etag(request, *args, **kwargs):
+        user = request.user
+        viewer = 'anonymous'
+        if user.is_authenticated:
+            get_token(request)
+            viewer = f'{user.pk}:{request.META["CSRF_COOKIE"]}'
+            if variant is not None:
+                viewer = f'{viewer}:{variant(request)}'
+        generations = '.'.join(map(str, get_generations(*scopes)))
+        raw = f'{generations}:{viewer}:{request.get_full_path()}'
+        return hashlib.md5(raw.encode()).hexdigest()
+    return condition(etag_func=etag)
@@ -1,8 +1,248 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
+FEED_KEYS = ('-pub_date', '-id')
+# Комментарии поста листаются от старых к новым.
+COMMENT_KEYS = ('created', 'id')
 
-def paginator_page(post_list, request, posts_per_page=10):
-    paginator = Paginator(post_list, posts_per_page)
+# Поля ключей пагинации, которые хранятся в курсоре как даты.
+DATETIME_KEYS = ('pub_date', 'created')
+
+AFTER = 'a'
+BEFORE = 'b'
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode_cursor(direction, values):
+    """Кодирует направление и значения ключа в непрозрачную строку."""
+    raw = json.dumps([direction, list(values)], default=_encode_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_value(name, value):
+    """Значение ключа name из курсора; неподходящее — ValueError."""
+    if name in DATETIME_KEYS:
+        moment = parse_datetime(value) if isinstance(value, str) else None
+        if moment is None or timezone.is_aware(moment) != settings.USE_TZ:
+            raise ValueError(f'{name}: {value!r}')
+        return moment
+    if isinstance(value, bool):
+        raise ValueError(f'{name}: {value!r}')
+    if name == 'id' or name.endswith('_id'):
+        if not isinstance(value, int):
+            raise ValueError(f'{name}: {value!r}')
+    elif not isinstance(value, (int, float)):
+        raise ValueError(f'{name}: {value!r}')
+    return value
+
+
+def decode_cursor(cursor, keys=FEED_KEYS):
+    """Раскодирует курсор для ключа keys.
+
+    Для испорченного или подделанного курсора — не того формата, другой
+    длины или с неподходящими значениями ключа — возвращает None.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in (AFTER, BEFORE) or len(values) != len(keys):
+            return None
+        return direction, [
+            _decode_value(key.lstrip('-'), value)
+            for key, value in zip(keys, values)
+        ]
+    except (TypeError, ValueError, binascii.Error):
+        return None
+
+
+def get_key(obj, keys):
+    """Значения ключа пагинации для объекта или словаря из values()."""
+    names = [key.lstrip('-') for key in keys]
+    if isinstance(obj, dict):
+        return tuple(obj[name] for name in names)
+    return tuple(getattr(obj, name) for name in names)
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Стоимость любой страницы не зависит от её глубины: выборка идёт
+    по индексу от значения ключа, сохранённого в курсоре. Отдаёт
+    обычный Page, поэтому общее число страниц неизвестно: num_pages
+    знает только о соседних страницах, а ссылки на них строятся
+    по next_cursor и previous_cursor.
+    """
+
+    is_keyset = True
+    # Старые ссылки глубже этой страницы открывают её: OFFSET
+    # с огромным номером переполняет целое в базе.
+    max_number = 1000
+
+    def __init__(self, object_list, per_page, keys=FEED_KEYS):
+        self.keys = tuple(keys)
+        self.next_cursor = None
+        self.previous_cursor = None
+        super().__init__(object_list, per_page)
+
+    def _check_object_list_is_ordered(self):
+        """Порядок задаётся ключом пагинации, проверка не нужна."""
+
+    def get_key(self, obj):
+        """Значения ключа пагинации для объекта страницы."""
+        return get_key(obj, self.keys)
+
+    def seek(self, direction, values):
+        """Условие «строго после/до значения ключа» в порядке ключа."""
+        condition = Q()
+        equal = {}
+        for key, value in zip(self.keys, values):
+            name = key.lstrip('-')
+            descending = key.startswith('-')
+            lookup = 'lt' if descending == (direction == AFTER) else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def fetch(self, direction=None, values=None, offset=0, limit=None):
+        """Возвращает до limit объектов после (или до) значения ключа.
+
+        Для направления BEFORE объекты возвращаются в обратном порядке.
+        """
+        ordering = self.keys
+        if direction == BEFORE:
+            ordering = tuple(
+                key[1:] if key.startswith('-') else f'-{key}'
+                for key in self.keys
+            )
+        queryset = self.object_list.order_by(*ordering)
+        if direction is not None:
+            queryset = queryset.filter(self.seek(direction, values))
+        return list(queryset[offset:offset + limit])
+
+    def page(self, number=None, cursor=None):
+        """Возвращает страницу по курсору или, для старых ссылок, по номеру.
+
+        Номер страницы обрабатывается через OFFSET, но без подсчёта строк,
+        и ограничен max_number.
+        """
+        decoded = decode_cursor(cursor, self.keys) if cursor else None
+        limit = self.per_page + 1
+        if decoded is not None:
+            direction, values = decoded
+            rows = self.fetch(direction, values, limit=limit)
+            more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            if direction == BEFORE:
+                rows.reverse()
+                return self._keyset_page(rows, has_next=True,
+                                         has_previous=more)
+            return self._keyset_page(rows, has_next=more, has_previous=True)
+        try:
+            number = min(max(int(number), 1), self.max_number)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = self.fetch(offset=offset, limit=limit)
+        more = len(rows) > self.per_page
+        return self._keyset_page(
+            rows[:self.per_page], has_next=more, has_previous=number > 1,
+            number=number,
+        )
+
+    def _keyset_page(self, rows, has_next, has_previous, number=None):
+        """Собирает Page и курсоры на соседние страницы."""
+        if number is None:
+            number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        if rows and has_next:
+            self.next_cursor = encode_cursor(AFTER, self.get_key(rows[-1]))
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(
+                BEFORE, self.get_key(rows[0])
+            )
+        return self._get_page(rows, number, self)
+
+    def get_page(self, number=None, cursor=None):
+        return self.page(number, cursor)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор по номеру страницы без COUNT(*) по большим таблицам.
+
+    Для всей таблицы число строк оценивается: в PostgreSQL по статистике
+    планировщика, в остальных базах по максимальному первичному ключу.
+    Точный COUNT(*) выполняется, только если оценка меньше
+    estimate_above. Для отфильтрованной выборки строки считаются
+    не дальше count_limit, поэтому листать можно не глубже этого предела.
+
+    Страница сначала выбирается по первичным ключам: большой OFFSET
+    проходит только по индексу, а связанные через select_related
+    строки подгружаются для одной страницы, а не для всех пропущенных.
+    """
+
+    estimate_above = 10000
+    count_limit = 10000
+
+    def _estimate(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            return int(row[0]) if row else 0
+        return queryset.model._default_manager.db_manager(
+            queryset.db
+        ).aggregate(estimate=Max('pk'))['estimate'] or 0
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if queryset.query.where:
+            return queryset[:self.count_limit].count()
+        estimate = self._estimate()
+        if estimate < self.estimate_above:
+            return queryset.count()
+        return estimate
+
+    def _get_page(self, object_list, number, paginator):
+        if isinstance(object_list, QuerySet):
+            pks = list(object_list.values_list('pk', flat=True))
+            object_list = self.object_list.filter(pk__in=pks)
+        return super()._get_page(object_list, number, paginator)
+
+
+def paginator_page(post_list, request, posts_per_page=10, keys=FEED_KEYS):
+    """Страница постов по параметрам запроса.
+
+    QuerySet пагинируется по ключу (параметр cursor), остальные
+    коллекции — обычным Paginator по номеру страницы.
+    """
     page_number = request.GET.get('page')
+    if isinstance(post_list, QuerySet):
+        paginator = KeysetPaginator(post_list, posts_per_page, keys)
+        return paginator.get_page(page_number, request.GET.get('cursor'))
+    paginator = Paginator(post_list, posts_per_page)
     page_obj = paginator.get_page(page_number)
     return page_obj
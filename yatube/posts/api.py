@@ -0,0 +1,222 @@
+"""JSON API лент, постов и комментариев только для чтения.
+
+Страницы отдаются по курсору (core.utils.paginate_page.KeysetPaginator)
+и содержат только поля из параметра fields. Строки выбираются через
+values() — без создания объектов моделей — и сразу сериализуются
+в JSON. Ответы лент поддерживают условный GET по ETag, как и
+HTML-страницы.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+
+from core.utils.page_cache import cache_page_versioned, page_etag
+from core.utils.paginate_page import (
+    COMMENT_KEYS, FEED_KEYS, KeysetPaginator,
+)
+from .feeds import TimelinePaginator
+from .models import Comment, Group, Post, User
+
+POSTS_PER_PAGE = 10
+# Области данных лент: в постах есть comments_count, а счётчик меняется
+# UPDATE без сигналов поста.
+FEED_SCOPES = ('posts', 'groups', 'users', 'comments')
+
+# Поле ответа — столбец values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'group_title': 'group__title',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+def _image_url(name):
+    return default_storage.url(name) if name else None
+
+
+CONVERTERS = {
+    'image': _image_url,
+}
+
+
+class FieldsError(ValueError):
+    """В параметре fields есть неизвестные поля."""
+
+
+def requested_fields(request, available):
+    """Поля из параметра fields (по умолчанию все) в порядке запроса."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = list(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступные поля: {", ".join(available)}.'
+        )
+    return fields
+
+
+def serialize(rows, fields, available):
+    """Словари ответа из строк values() только с полями fields."""
+    converters = [
+        (name, available[name], CONVERTERS.get(name)) for name in fields
+    ]
+    return [
+        {
+            name: convert(row[column]) if convert else row[column]
+            for name, column, convert in converters
+        }
+        for row in rows
+    ]
+
+
+def error(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def page_response(request, paginator, available):
+    """Ответ со страницей paginator по курсору из запроса."""
+    page_obj = paginator.get_page(cursor=request.GET.get('cursor'))
+    return JsonResponse(
+        {
+            'results': serialize(page_obj, request.api_fields, available),
+            'next_cursor': paginator.next_cursor,
+            'previous_cursor': paginator.previous_cursor,
+        },
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def columns(fields, available, keys):
+    """Столбцы values() для полей fields.
+
+    Столбцы ключа пагинации keys выбираются всегда, даже если их нет
+    среди запрошенных полей: по ним строится курсор.
+    """
+    names = [available[name] for name in fields]
+    names += [key.lstrip('-') for key in keys]
+    return list(dict.fromkeys(names))
+
+
+def with_fields(available):
+    """Разбирает параметр fields; неизвестные поля — ответ 400."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                request.api_fields = requested_fields(request, available)
+            except FieldsError as exc:
+                return error(str(exc), 400)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def posts_response(request, posts):
+    """Страница постов posts в JSON."""
+    posts = posts.values(*columns(request.api_fields, POST_FIELDS, FEED_KEYS))
+    paginator = KeysetPaginator(posts, POSTS_PER_PAGE, FEED_KEYS)
+    return page_response(request, paginator, POST_FIELDS)
+
+
+@page_etag(FEED_SCOPES)
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'api_index', FEED_SCOPES
+)
+@with_fields(POST_FIELDS)
+def index(request):
+    """Лента всех постов."""
+    return posts_response(request, Post.objects.all())
+
+
+@page_etag(FEED_SCOPES)
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'api_group', FEED_SCOPES
+)
+@with_fields(POST_FIELDS)
+def group_posts(request, slug):
+    """Лента постов группы."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True
+    ).first()
+    if group_id is None:
+        return error('Группа не найдена.', 404)
+    return posts_response(request, Post.objects.filter(group_id=group_id))
+
+
+@page_etag(FEED_SCOPES)
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'api_profile', FEED_SCOPES
+)
+@with_fields(POST_FIELDS)
+def profile(request, username):
+    """Лента постов автора."""
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True
+    ).first()
+    if author_id is None:
+        return error('Пользователь не найден.', 404)
+    return posts_response(request, Post.objects.filter(author_id=author_id))
+
+
+@page_etag(FEED_SCOPES + ('follows',))
+@with_fields(POST_FIELDS)
+def follow_index(request):
+    """Лента подписок текущего пользователя."""
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация.', 401)
+    posts = Post.objects.values(
+        *columns(request.api_fields, POST_FIELDS, FEED_KEYS)
+    )
+    paginator = TimelinePaginator(request.user, POSTS_PER_PAGE, posts)
+    return page_response(request, paginator, POST_FIELDS)
+
+
+@page_etag(('posts', 'groups', 'users', 'comments'))
+@with_fields(POST_FIELDS)
+def post_detail(request, post_id):
+    """Пост."""
+    rows = Post.objects.filter(id=post_id).values(
+        *columns(request.api_fields, POST_FIELDS, ())
+    )
+    if not rows:
+        return error('Пост не найден.', 404)
+    return JsonResponse(
+        serialize(rows, request.api_fields, POST_FIELDS)[0],
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+@page_etag(('users', 'comments'))
+@with_fields(COMMENT_FIELDS)
+def post_comments(request, post_id):
+    """Комментарии поста, старые первыми."""
+    if not Post.objects.filter(id=post_id).exists():
+        return error('Пост не найден.', 404)
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *columns(request.api_fields, COMMENT_FIELDS, COMMENT_KEYS)
+    )
+    paginator = KeysetPaginator(
+        comments, settings.COMMENTS_PER_PAGE, COMMENT_KEYS
+    )
+    return page_response(request, paginator, COMMENT_FIELDS)
@@ -5,3 +5,7 @@ class PostsConfig(AppConfig):
     """Конфигурация названия приложения."""
 
     name = 'posts'
+
+    def ready(self):
+        """Подключает обработчики сигналов."""
+        from . import signals  # noqa: F401
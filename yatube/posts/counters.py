@@ -0,0 +1,116 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарными UPDATE ... SET n = n + 1 из обработчиков
+сигналов, то есть в транзакции самого изменения. reconcile_* пачками
+пересчитывают их по исходным таблицам.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+}
+
+
+def _changes(deltas):
+    return {
+        name: Greatest(F(name) + delta, 0) for name, delta in deltas.items()
+    }
+
+
+def bump_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя.
+
+    Если строки счётчиков нет, она создаётся пересчётом, но только при
+    увеличении: уменьшение без строки бывает при каскадном удалении
+    самого пользователя.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **_changes(deltas)
+    )
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        reconcile_users([user_id])
+
+
+def bump_group(group_id, delta):
+    """Сдвигает счётчик постов группы."""
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            **_changes({'posts_count': delta})
+        )
+
+
+def bump_post(post_id, delta):
+    """Сдвигает счётчик комментариев поста."""
+    Post.objects.filter(pk=post_id).update(
+        **_changes({'comments_count': delta})
+    )
+
+
+def _counts(model, field, ids):
+    return dict(
+        model.objects.filter(**{f'{field}__in': ids}).order_by()
+        .values(field).annotate(total=Count('pk'))
+        .values_list(field, 'total')
+    )
+
+
+def reconcile_users(user_ids):
+    """Пересчитывает счётчики пользователей по исходным таблицам."""
+    user_ids = list(User.objects.filter(pk__in=user_ids).values_list(
+        'pk', flat=True
+    ))
+    counts = {
+        name: _counts(model, field, user_ids)
+        for name, (model, field) in USER_COUNTERS.items()
+    }
+    stats = [
+        UserStats(user_id=user_id, **{
+            name: values.get(user_id, 0) for name, values in counts.items()
+        })
+        for user_id in user_ids
+    ]
+    UserStats.objects.bulk_create(stats, ignore_conflicts=True)
+    UserStats.objects.bulk_update(stats, list(USER_COUNTERS))
+
+
+def reconcile_groups(group_ids):
+    """Пересчитывает счётчики постов групп."""
+    counts = _counts(Post, 'group_id', group_ids)
+    groups = [
+        Group(pk=group_id, posts_count=counts.get(group_id, 0))
+        for group_id in group_ids
+    ]
+    Group.objects.bulk_update(groups, ['posts_count'])
+
+
+def reconcile_posts(post_ids):
+    """Пересчитывает счётчики комментариев постов."""
+    counts = _counts(Comment, 'post_id', post_ids)
+    posts = [
+        Post(pk=post_id, comments_count=counts.get(post_id, 0))
+        for post_id in post_ids
+    ]
+    Post.objects.bulk_update(posts, ['comments_count'])
+
+
+def batches(queryset, batch_size):
+    """Первичные ключи queryset пачками по batch_size."""
+    last_pk = None
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = queryset
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
@@ -0,0 +1,280 @@
+"""Лента подписок.
+
+Посты обычных авторов раскладываются в ленты подписчиков при записи
+(fan-out on write), поэтому follow_index читает одну ленту пользователя
+диапазоном по индексу (user, pub_date, post) вместо соединения Follow
+и Post.
+
+У авторов с числом подписчиков от FEED_CELEBRITY_FOLLOWERS раскладка
+слишком дорога: их посты не пишутся в ленты, а подмешиваются при чтении
+(pull) слиянием кучей из закешированных списков последних постов автора.
+Когда автор опускается ниже порога, его последние посты раскладываются
+по лентам подписчиков (fan_in): вышедшие при pull-модели посты иначе
+пропали бы из лент.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from core.utils.paginate_page import (
+    AFTER, BEFORE, KeysetPaginator, get_key,
+)
+from .models import Follow, Post, TimelineEntry, UserStats
+
+TIMELINE_KEYS = ('-pub_date', '-post_id')
+CELEBRITIES_KEY = 'feed:celebrities'
+# Авторы, посты которых читались по pull-модели при последнем пересчёте;
+# хранится без срока, чтобы заметить выход автора из списка.
+PULLED_KEY = 'feed:pulled'
+FAN_IN_BATCH_SIZE = 1000
+RECENT_POSTS_KEY = 'feed:recent:{}'
+
+
+def timeline_length():
+    """Максимальная длина ленты одного пользователя."""
+    return settings.FOLLOW_TIMELINE_LENGTH
+
+
+def trim_timelines(user_ids):
+    """Обрезает ленты пользователей до timeline_length() записей."""
+    length = timeline_length()
+    oldest_kept = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by(*TIMELINE_KEYS).values('pub_date')[length - 1:length]
+    TimelineEntry.objects.filter(
+        user_id__in=list(user_ids),
+        pub_date__lt=Subquery(oldest_kept),
+    ).delete()
+
+
+def celebrity_ids():
+    """Множество id авторов, посты которых читаются по pull-модели.
+
+    Список берётся из счётчиков подписчиков UserStats и пересчитывается
+    не чаще раза в FEED_CELEBRITIES_TIMEOUT секунд: авторов с таким
+    числом подписчиков единицы, а пересечение порога на несколько минут
+    позже некритично. Выбывшим из списка авторам выполняется fan_in.
+    """
+    ids = cache.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = frozenset(UserStats.objects.filter(
+            followers_count__gte=settings.FEED_CELEBRITY_FOLLOWERS
+        ).values_list('user_id', flat=True))
+        cache.set(CELEBRITIES_KEY, ids, settings.FEED_CELEBRITIES_TIMEOUT)
+        previous = cache.get(PULLED_KEY, frozenset())
+        cache.set(PULLED_KEY, ids, None)
+        for author_id in sorted(previous - ids):
+            fan_in(author_id)
+    return ids
+
+
+def recent_posts(author_ids):
+    """Ключи (pub_date, id) последних постов авторов, новые первыми.
+
+    Списки хранятся в кеше по одному на автора и читаются одним
+    get_many; промахи догружаются из базы.
+    """
+    keys = {RECENT_POSTS_KEY.format(author_id): author_id
+            for author_id in author_ids}
+    found = cache.get_many(keys)
+    missing = {}
+    for key, author_id in keys.items():
+        if key not in found:
+            missing[key] = list(
+                Post.objects.filter(author_id=author_id).order_by(
+                    '-pub_date', '-id'
+                ).values_list('pub_date', 'id')[:settings.FEED_RECENT_POSTS]
+            )
+    if missing:
+        cache.set_many(missing)
+        found.update(missing)
+    return {keys[key]: posts for key, posts in found.items()}
+
+
+def forget_recent_posts(author_id):
+    """Сбрасывает закешированный список последних постов автора."""
+    cache.delete(RECENT_POSTS_KEY.format(author_id))
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты всех подписчиков автора.
+
+    Посты авторов из celebrity_ids() не раскладываются.
+    """
+    if post.author_id in celebrity_ids():
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if not follower_ids:
+        return
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        ignore_conflicts=True,
+    )
+    trim_timelines(follower_ids)
+
+
+def fan_in(author_id):
+    """Раскладывает последние посты автора по лентам его подписчиков.
+
+    Берутся FEED_RECENT_POSTS постов — столько подписчики видели, пока
+    посты автора читались по pull-модели.
+    """
+    recent = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:settings.FEED_RECENT_POSTS])
+    if not recent:
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+    for start in range(0, len(follower_ids), FAN_IN_BATCH_SIZE):
+        user_ids = follower_ids[start:start + FAN_IN_BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id, post_id=post_id, pub_date=pub_date
+                )
+                for user_id in user_ids
+                for post_id, pub_date in recent
+            ),
+            ignore_conflicts=True,
+        )
+        trim_timelines(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя последние посты нового автора."""
+    if author_id in celebrity_ids():
+        return
+    recent = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in recent
+        ),
+        ignore_conflicts=True,
+    )
+    trim_timelines([user_id])
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя по его текущим подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    recent = Post.objects.filter(
+        author__following__user_id=user_id
+    ).exclude(
+        author_id__in=celebrity_ids()
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in recent.iterator()
+        )
+    )
+
+
+def merge_keys(streams, direction=None, values=None, limit=None):
+    """Сливает упорядоченные потоки ключей (pub_date, id) в одну страницу.
+
+    Потоки упорядочены от новых к старым, для BEFORE — от старых
+    к новым. Ключи, не лежащие строго после (до) values, отбрасываются,
+    повторы одного поста из разных потоков склеиваются.
+    """
+    if direction == AFTER:
+        streams = [
+            (key for key in stream if tuple(key) < tuple(values))
+            for stream in streams
+        ]
+    elif direction == BEFORE:
+        streams = [
+            (key for key in stream if tuple(key) > tuple(values))
+            for stream in streams
+        ]
+    merged = heapq.merge(*streams, reverse=direction != BEFORE)
+    page = []
+    seen = set()
+    for pub_date, post_id in merged:
+        if post_id in seen:
+            continue
+        seen.add(post_id)
+        page.append((pub_date, post_id))
+        if len(page) == limit:
+            break
+    return page
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Курсорная пагинация ленты подписок.
+
+    Ключи страницы берутся из записей TimelineEntry пользователя и из
+    списков последних постов авторов-знаменитостей, на которых он
+    подписан, а затем одним запросом подгружаются сами посты — из posts,
+    по умолчанию для карточек ленты.
+    """
+
+    def __init__(self, user, per_page, posts=None):
+        self.user = user
+        self.posts = Post.objects.for_feed() if posts is None else posts
+        super().__init__(
+            TimelineEntry.objects.filter(user=user), per_page, TIMELINE_KEYS
+        )
+
+    def pulled_streams(self, direction):
+        """Списки последних постов знаменитостей из подписок."""
+        celebrities = celebrity_ids()
+        if not celebrities:
+            return []
+        author_ids = Follow.objects.filter(
+            user=self.user, author_id__in=celebrities
+        ).values_list('author_id', flat=True)
+        streams = recent_posts(author_ids).values()
+        if direction == BEFORE:
+            return [stream[::-1] for stream in streams]
+        return list(streams)
+
+    def fetch(self, direction=None, values=None, offset=0, limit=None):
+        # Знаменитости выбираются до чтения ленты: пересчёт их списка
+        # может дописать в неё посты выбывших авторов (fan_in).
+        pulled = self.pulled_streams(direction)
+        entries = super().fetch(direction, values, limit=offset + limit)
+        streams = [[(entry.pub_date, entry.post_id) for entry in entries]]
+        streams.extend(pulled)
+        keys = merge_keys(streams, direction, values, offset + limit)
+        keys = keys[offset:]
+        posts = {
+            get_key(post, ('id',))[0]: post for post in self.posts.filter(
+                pk__in=[post_id for _, post_id in keys]
+            )
+        }
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+    def get_key(self, post):
+        return get_key(post, ('pub_date', 'id'))
+
+
+def follow_page(request, per_page=10):
+    """Страница ленты подписок текущего пользователя."""
+    paginator = TimelinePaginator(request.user, per_page)
+    return paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor')
+    )
@@ -0,0 +1,218 @@
+"""Подписки на авторов.
+
+Уникальность пары (user, author) и запрет подписки на себя держит база
+(ограничения модели Follow), поэтому follow и unfollow — по одному
+идемпотентному запросу без предварительных проверок: повторная или
+параллельная подписка просто не вставляет строку. Обработчики
+сигналов Follow (лента, счётчики, страницы) вызываются, только если
+строка действительно вставлена или удалена.
+
+follow_many и unfollow_many меняют подписки пачками для импорта графа
+подписок; сигналы по отдельным парам не отправляются, а ленты
+и счётчики затронутых пользователей пересчитываются раз на пачку.
+
+following_ids отвечает, на кого подписан пользователь, для кнопок
+подписки: id авторов хранятся в кеше одним упорядоченным массивом
+по 4 байта на автора и сбрасываются при подписке и отписке.
+"""
+from array import array
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from core.utils.page_cache import bump_generation_on_commit
+from . import counters, feeds
+from .models import Follow
+
+User = get_user_model()
+
+FOLLOWING_KEY = 'following:{}'
+# Первичные ключи AutoField — 32-битные целые.
+ID_TYPECODE = 'I'
+
+
+def _connection():
+    return connections[router.db_for_write(Follow)]
+
+
+def following_ids(user):
+    """Множество id авторов, на которых подписан user.
+
+    Читается одним обращением к кешу и запоминается на объекте
+    пользователя, поэтому все кнопки подписки на странице обходятся
+    одним чтением кеша; промах — одним запросом к базе.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_following_ids', None)
+    if ids is None:
+        key = FOLLOWING_KEY.format(user.pk)
+        stored = cache.get(key)
+        if stored is None:
+            ids = array(ID_TYPECODE, sorted(Follow.objects.filter(
+                user_id=user.pk
+            ).values_list('author_id', flat=True)))
+            cache.set(key, ids.tobytes(), settings.FOLLOWING_CACHE_TIMEOUT)
+        else:
+            ids = array(ID_TYPECODE)
+            ids.frombytes(stored)
+        ids = frozenset(ids)
+        user._following_ids = ids
+    return ids
+
+
+def forget_following(user_ids):
+    """Сбрасывает закешированные подписки пользователей."""
+    cache.delete_many([FOLLOWING_KEY.format(user_id)
+                       for user_id in user_ids])
+
+
+def follow(user_id, author_id):
+    """Подписывает пользователя на автора; True, если подписка новая.
+
+    INSERT ... SELECT не вставит строку, если автора нет, если это сам
+    пользователь или если подписка уже есть.
+    """
+    connection = _connection()
+    ops = connection.ops
+    sql = (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(Follow._meta.db_table)} (user_id, author_id) '
+        f'SELECT %s, id FROM {ops.quote_name(User._meta.db_table)} '
+        f'WHERE id = %s AND id <> %s '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, author_id, user_id])
+            created = cursor.rowcount == 1
+        if created:
+            post_save.send(
+                sender=Follow,
+                instance=Follow(user_id=user_id, author_id=author_id),
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=connection.alias,
+            )
+    return created
+
+
+def unfollow(user_id, author_id):
+    """Отписывает пользователя от автора; True, если подписка была."""
+    connection = _connection()
+    sql = (
+        f'DELETE FROM {connection.ops.quote_name(Follow._meta.db_table)} '
+        f'WHERE user_id = %s AND author_id = %s'
+    )
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, author_id])
+            deleted = cursor.rowcount == 1
+        if deleted:
+            post_delete.send(
+                sender=Follow,
+                instance=Follow(user_id=user_id, author_id=author_id),
+                using=connection.alias,
+            )
+    return deleted
+
+
+def chunks(iterable, size):
+    """Списки по size элементов из iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _existing(pairs):
+    """Подписки по парам из pairs: {(user_id, author_id): id}."""
+    user_ids = {user_id for user_id, _ in pairs}
+    author_ids = {author_id for _, author_id in pairs}
+    rows = Follow.objects.filter(
+        user_id__in=user_ids, author_id__in=author_ids
+    ).values_list('user_id', 'author_id', 'id')
+    return {
+        (user_id, author_id): follow_id
+        for user_id, author_id, follow_id in rows
+        if (user_id, author_id) in pairs
+    }
+
+
+def _refresh(pairs):
+    """Пересчитывает ленты и счётчики участников пар.
+
+    Подписки в кеше и страницы сбрасываются после фиксации пачки.
+    """
+    user_ids = {user_id for user_id, _ in pairs}
+    for user_id in sorted(user_ids):
+        feeds.rebuild(user_id)
+    counters.reconcile_users(
+        user_ids | {author_id for _, author_id in pairs}
+    )
+    transaction.on_commit(partial(forget_following, user_ids))
+    bump_generation_on_commit('follows')
+
+
+def follow_many(pairs, batch_size=1000):
+    """Подписывает пачками пары (user_id, author_id).
+
+    Пары с несуществующими пользователями и подписки на себя
+    пропускаются. Каждая пачка — отдельная транзакция: вставка одним
+    INSERT и пересчёт лент и счётчиков её пользователей. Возвращает
+    число новых подписок.
+    """
+    created = 0
+    for chunk in chunks(pairs, batch_size):
+        chunk = {(user_id, author_id) for user_id, author_id in chunk
+                 if user_id != author_id}
+        known = set(User.objects.filter(
+            pk__in={user_id for pair in chunk for user_id in pair}
+        ).values_list('pk', flat=True))
+        chunk = {pair for pair in chunk if known.issuperset(pair)}
+        with transaction.atomic():
+            new = chunk - _existing(chunk).keys()
+            if not new:
+                continue
+            Follow.objects.bulk_create(
+                (Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in new),
+                ignore_conflicts=True,
+            )
+            _refresh(new)
+        created += len(new)
+    return created
+
+
+def unfollow_many(pairs, batch_size=1000):
+    """Отписывает пачками пары (user_id, author_id).
+
+    Возвращает число удалённых подписок.
+    """
+    deleted = 0
+    connection = _connection()
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    for chunk in chunks(pairs, batch_size):
+        with transaction.atomic(using=connection.alias):
+            found = _existing({tuple(pair) for pair in chunk})
+            if not found:
+                continue
+            # Удаляем в обход QuerySet.delete(): он отправил бы сигналы
+            # по каждой паре, а ленты и счётчики пересчитываются ниже.
+            placeholders = ', '.join(['%s'] * len(found))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE id IN ({placeholders})',
+                    list(found.values()),
+                )
+            _refresh(found.keys())
+        deleted += len(found)
+    return deleted
@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from .models import Post, Comment
 from django.utils.translation import gettext_lazy as _
+from core.utils.images import normalize_image
 
 
 class PostForm(forms.ModelForm):
@@ -29,6 +32,17 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Минимум 20 символов')
         return data
 
+    def clean_image(self):
+        """Уменьшает новую картинку и перекодирует её в JPEG без EXIF."""
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return normalize_image(
+                image,
+                settings.POST_IMAGE_MAX_SIZE,
+                settings.POST_IMAGE_QUALITY,
+            )
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Создание формы комментариев."""
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    """Пересчёт рекомендаций «Кого читать»."""
+
+    help = (
+        'Строит граф подписок в памяти и пересчитывает рекомендации '
+        'авторов для всех пользователей с подписками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Скольким пользователям обновлять рекомендации '
+                 'в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        graph = suggestions.FollowGraph.load()
+        loaded = time.perf_counter()
+        total = suggestions.rebuild(graph, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {total} пользователей: '
+            f'граф {loaded - started:.1f} с, '
+            f'пересчёт {time.perf_counter() - loaded:.1f} с'
+        ))
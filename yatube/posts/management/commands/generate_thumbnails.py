@@ -0,0 +1,44 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """Заблаговременная генерация миниатюр уже загруженных картинок."""
+
+    help = (
+        'Создаёт миниатюры всех геометрий шаблонов для картинок постов '
+        'параллельно в нескольких процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов, 0 — генерировать в текущем процессе.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=16,
+            help='Сколько картинок отдавать процессу за раз.'
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.filter(image__startswith='posts/').values_list(
+            'image', flat=True
+        ).order_by('pk').iterator()
+        if options['workers']:
+            with thumbnails.pool(options['workers']) as pool:
+                errors = list(pool.map(
+                    thumbnails.try_generate, names,
+                    chunksize=options['chunk_size'],
+                ))
+        else:
+            errors = [thumbnails.try_generate(name) for name in names]
+        failed = [error for error in errors if error]
+        for error in failed:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(errors)}, с ошибками: {len(failed)}'
+        ))
@@ -0,0 +1,49 @@
+import csv
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import follows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Импорт графа подписок."""
+
+    help = (
+        'Подписывает (или отписывает) пользователей пачками по CSV-файлу '
+        'со строками «подписчик,автор» из имён пользователей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV-файл с парами имён.')
+        parser.add_argument(
+            '--unfollow', action='store_true',
+            help='Удалить подписки из файла вместо добавления.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько пар обрабатывать в одной транзакции.'
+        )
+
+    def pairs(self, rows, batch_size):
+        """Пары id по строкам файла; имена разрешаются пачками."""
+        for chunk in follows.chunks(rows, batch_size):
+            ids = dict(User.objects.filter(
+                username__in={name for row in chunk for name in row[:2]}
+            ).values_list('username', 'pk'))
+            for row in chunk:
+                if row[0] in ids and row[1] in ids:
+                    yield ids[row[0]], ids[row[1]]
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        change = follows.unfollow_many if options['unfollow'] else (
+            follows.follow_many
+        )
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            rows = (row for row in csv.reader(file) if len(row) >= 2)
+            total = change(self.pairs(rows, batch_size), batch_size)
+        action = 'Удалено' if options['unfollow'] else 'Добавлено'
+        self.stdout.write(self.style.SUCCESS(f'{action} подписок: {total}'))
@@ -0,0 +1,92 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import imports
+
+
+class Command(BaseCommand):
+    """Массовый импорт постов."""
+
+    help = (
+        'Импортирует посты из файла JSON Lines или CSV с полями text, '
+        'author (имя пользователя), group (slug), pub_date (ISO 8601) '
+        'и image (адрес или путь к картинке).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv.')
+        parser.add_argument(
+            '--format', choices=imports.FORMATS,
+            help='Формат файла; по умолчанию по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать отсутствующих авторов и группы.'
+        )
+        parser.add_argument(
+            '--image-workers', type=int, default=0,
+            help='Потоков загрузки картинок; 0 — картинки не загружать.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path
+        )[1].lstrip('.').lower()
+        if file_format not in imports.FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла: {path}. Укажите --format.'
+            )
+        started = time.perf_counter()
+        skipped = 0
+        warnings = 0
+        processed = 0
+
+        def on_error(number, message):
+            nonlocal skipped
+            skipped += 1
+            self.stderr.write(f'Строка {number}: {message}')
+
+        def on_warning(number, message):
+            nonlocal warnings
+            warnings += 1
+            self.stderr.write(self.style.WARNING(
+                f'Строка {number} импортирована без картинки: {message}'
+            ))
+
+        def on_batch(count):
+            nonlocal processed
+            processed += count
+            if options['verbosity'] >= 2:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Импортировано {processed} '
+                    f'({processed / elapsed:.0f} строк/с)'
+                )
+
+        workers = options['image_workers']
+        pool = ThreadPoolExecutor(workers) if workers else nullcontext()
+        with open(path, newline='', encoding='utf-8') as file, pool:
+            imported = imports.import_posts(
+                imports.parse(imports.records(file, file_format), on_error),
+                batch_size=options['batch_size'],
+                create_missing=options['create_missing'],
+                image_pool=pool if workers else None,
+                on_error=on_error,
+                on_warning=on_warning,
+                on_batch=on_batch,
+            )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {imported}, пропущено строк: '
+            f'{skipped}, без картинки: {warnings} за {elapsed:.1f} с '
+            f'({imported / elapsed:.0f} строк/с)'
+        ))
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Пересчёт денормализованных счётчиков."""
+
+    help = (
+        'Пересчитывает счётчики постов, подписчиков, подписок '
+        'и комментариев по исходным таблицам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько строк пересчитывать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        targets = (
+            ('пользователей', User.objects.all(), counters.reconcile_users),
+            ('групп', Group.objects.all(), counters.reconcile_groups),
+            ('постов', Post.objects.all(), counters.reconcile_posts),
+        )
+        for title, queryset, reconcile in targets:
+            total = 0
+            for batch in counters.batches(queryset, batch_size):
+                reconcile(batch)
+                total += len(batch)
+            self.stdout.write(f'Пересчитано {title}: {total}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,54 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """Отчёт об экономии трафика вариантами миниатюр карточек."""
+
+    help = (
+        'Создаёт недостающие варианты миниатюр картинок posts/ и сравнивает '
+        'их суммарный объём с единственной миниатюрой 960x339 JPEG.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов, 0 — генерировать в текущем процессе.'
+        )
+
+    def size(self, name, geometry, options):
+        thumbnail = get_thumbnail(name, geometry, **options)
+        return default_storage.size(thumbnail.name)
+
+    def handle(self, *args, **options):
+        names = list(Post.objects.filter(
+            image__startswith='posts/'
+        ).values_list('image', flat=True).order_by('pk'))
+        if options['workers']:
+            with thumbnails.pool(options['workers']) as pool:
+                errors = list(pool.map(thumbnails.try_generate, names))
+        else:
+            errors = [thumbnails.try_generate(name) for name in names]
+        names = [name for name, error in zip(names, errors) if not error]
+        geometry, feed_options = thumbnails.FEED_GEOMETRY
+        baseline = sum(self.size(name, geometry, feed_options)
+                       for name in names)
+        self.stdout.write(f'Картинок: {len(names)}, с ошибками: '
+                          f'{len(errors) - len(names)}')
+        self.stdout.write(
+            f'{geometry} JPEG (сейчас): {baseline / 1024:.1f} КБ'
+        )
+        for variant, variant_options, _, _ in thumbnails.FEED_VARIANTS:
+            total = sum(self.size(name, variant, variant_options)
+                        for name in names)
+            saving = 100 * (1 - total / baseline) if baseline else 0
+            self.stdout.write(
+                f'{variant} {variant_options["format"]}: '
+                f'{total / 1024:.1f} КБ, экономия {saving:.1f}%'
+            )
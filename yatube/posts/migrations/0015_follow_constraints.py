@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:24
+
+from django.db import migrations, models
+import django.db.models.expressions
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, field):
+    """Подзапрос числа строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def remove_invalid_follows(apps, schema_editor):
+    """Удаляет подписки на себя и повторы, которые нарушат ограничения.
+
+    Из повторов остаётся самая ранняя подписка; если что-то удалено,
+    счётчики подписок пересчитываются.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    removed, _ = Follow.objects.filter(user=F('author')).delete()
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1).order_by()
+    for row in duplicates.iterator():
+        extra, _ = Follow.objects.filter(
+            user_id=row['user'], author_id=row['author'],
+        ).exclude(id=row['first_id']).delete()
+        removed += extra
+    if removed:
+        UserStats.objects.update(
+            followers_count=count_of(Follow, 'author'),
+            following_count=count_of(Follow, 'user'),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_comment_post_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_invalid_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='follow_not_self'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('group', 'Группа'), ('author', 'Автор')], max_length=8, verbose_name='Тип объекта')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('bucket', models.PositiveIntegerField(verbose_name='Номер интервала')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Число событий')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendbucket',
+            index=models.Index(fields=['kind', 'bucket'], name='trend_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendbucket',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id', 'bucket'), name='unique_trend_bucket'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from importlib import import_module
+
+from django.db import migrations, models
+
+# SQLite добавляет столбец, пересоздавая таблицу posts_post, и теряет
+# её триггеры, поэтому индекс поиска пересоздаётся вокруг AddField.
+search = import_module('posts.migrations.0013_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_trendbucket'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            search.run(search.DROP), search.run(search.CREATE)
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail_variants',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Варианты миниатюры созданы'),
+        ),
+        migrations.RunPython(
+            search.run(search.CREATE), search.run(search.DROP)
+        ),
+    ]
@@ -3,6 +3,34 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Поля, которые выводит карточка поста в лентах.
+FEED_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'image',
+    'thumbnail_variants',
+    'version',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    """Выборки постов."""
+
+    def for_feed(self):
+        """Посты для карточек лент вместе с автором и группой."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост со страницы поста вместе с автором, его счётчиками
+        и группой — одним запросом."""
+        return self.select_related('author__stats', 'group')
+
 
 class Post(models.Model):
     """Создание модели Post."""
@@ -37,10 +65,41 @@ class Post(models.Model):
         blank=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        'Версия содержимого',
+        default=1,
+        editable=False,
+    )
+    thumbnail_variants = models.BooleanField(
+        'Варианты миниатюры созданы',
+        default=False,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         """Сортировка по дате поста."""
 
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_feed_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx'
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -48,6 +107,39 @@ class Post(models.Model):
         """Метод __str__ возвращает первые 15 символов поста."""
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        """Каждая правка поста начинает новую версию его содержимого.
+
+        У новой картинки вариантов миниатюры ещё нет.
+        """
+        if self.pk is not None:
+            self.version += 1
+            changed = {'version'}
+            loaded_image = getattr(self, '_loaded_image', models.DEFERRED)
+            if loaded_image not in (models.DEFERRED, self.image.name):
+                self.thumbnail_variants = False
+                changed.add('thumbnail_variants')
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *changed}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает группу и картинку из базы.
+
+        По ним сигналы узнают, что изменилось: нужно ли пересчитать
+        счётчики групп и создать миниатюры новой картинки.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get(
+            'group_id', models.DEFERRED
+        )
+        instance._loaded_image = instance.__dict__.get(
+            'image', models.DEFERRED
+        )
+        return instance
+
 
 class Group(models.Model):
     """Создание модели Group."""
@@ -55,6 +147,11 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         """Метод __str__ возвращает название группы."""
@@ -84,6 +181,15 @@ class Comment(models.Model):
         related_name='comments',
     )
 
+    class Meta:
+        """Комментарии поста выводятся по ключу (created, id)."""
+
+        indexes = (
+            models.Index(
+                fields=('post', 'created', 'id'), name='comment_post_idx'
+            ),
+        )
+
     def __str__(self):
         """Метод __str__ возвращает первые 15 символов комментария."""
         return self.text[:15]
@@ -102,3 +208,131 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        """Подписка на автора одна, на себя подписаться нельзя."""
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='follow_not_self'
+            ),
+        )
+
+
+class Suggestion(models.Model):
+    """Автор, которого рекомендуется читать пользователю.
+
+    Строки пересчитывает команда build_suggestions.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.PositiveIntegerField('Вес рекомендации')
+
+    class Meta:
+        """Рекомендации пользователя читаются по индексу (user, author)."""
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_suggestion'
+            ),
+        )
+
+
+class TrendBucket(models.Model):
+    """Число событий объекта за один интервал времени.
+
+    Из интервалов за последний час или сутки складывается рейтинг
+    раздела «Популярное» (posts.trending).
+    """
+
+    POST = 'post'
+    GROUP = 'group'
+    AUTHOR = 'author'
+    KINDS = (
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+        (AUTHOR, 'Автор'),
+    )
+
+    kind = models.CharField('Тип объекта', max_length=8, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    bucket = models.PositiveIntegerField('Номер интервала')
+    count = models.PositiveIntegerField('Число событий', default=0)
+
+    class Meta:
+        """Рейтинг читается диапазоном интервалов по индексу
+        (kind, bucket)."""
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id', 'bucket'),
+                name='unique_trend_bucket'
+            ),
+        )
+        indexes = (
+            models.Index(fields=('kind', 'bucket'), name='trend_bucket_idx'),
+        )
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        """Лента читается диапазоном по индексу (user, pub_date, post)."""
+
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_feed_idx'
+            ),
+        )
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, чтобы не считать их COUNT(*) на страницах."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self):
+        """Метод __str__ возвращает имя пользователя."""
+        return str(self.user)
@@ -0,0 +1,123 @@
+"""Полнотекстовый поиск по постам.
+
+В SQLite текст постов проиндексирован таблицей FTS5 posts_post_fts
+(миграция 0013_post_search), которую триггеры синхронизируют
+с posts_post. Результаты упорядочены по релевантности bm25, а страницы
+листаются курсором по ключу (релевантность, id), как и ленты.
+В других базах поиск идёт через LIKE, новые посты первыми.
+
+Релевантность считается только для SEARCH_RANKED_MATCHES самых новых
+совпадений: у частого слова совпадают почти все посты, и ранжирование
+их всех стоило бы секунды на каждую страницу.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from core.utils.paginate_page import AFTER, BEFORE, KeysetPaginator
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_KEYS = ('search_rank', '-id')
+WORD = re.compile(r'\w+')
+
+
+def match_query(text):
+    """Запрос FTS5 из слов text: все слова обязательны.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5
+    в пользовательском вводе не срабатывают.
+    """
+    return ' '.join(f'"{word}"' for word in WORD.findall(text.lower()))
+
+
+def fts_available():
+    """Есть ли в текущей базе индекс FTS5."""
+    return connection.vendor == 'sqlite'
+
+
+class SearchPaginator(KeysetPaginator):
+    """Курсорная пагинация результатов поиска по релевантности.
+
+    Ключи страницы выбираются из индекса FTS5 одним запросом с учётом
+    фильтров по группе и автору, затем посты подгружаются одним
+    запросом. Релевантность сохраняется в post.search_rank.
+    """
+
+    def __init__(self, query, per_page, group=None, author=None):
+        self.query = match_query(query)
+        self.group = group
+        self.author = author
+        super().__init__(Post.objects.none(), per_page, SEARCH_KEYS)
+
+    def fetch(self, direction=None, values=None, offset=0, limit=None):
+        if not self.query:
+            return []
+        conditions = [f'{FTS_TABLE} MATCH %s']
+        params = [self.query]
+        if self.group is not None:
+            conditions.append('post.group_id = %s')
+            params.append(self.group.pk)
+        if self.author is not None:
+            conditions.append('post.author_id = %s')
+            params.append(self.author.pk)
+        params.append(settings.SEARCH_RANKED_MATCHES)
+        seek = ''
+        ordering = 'search_rank, id DESC'
+        if direction is not None:
+            after = direction == AFTER
+            seek = (
+                f'WHERE search_rank {">" if after else "<"} %s '
+                f'OR (search_rank = %s AND id {"<" if after else ">"} %s) '
+            )
+            params.extend([values[0], values[0], values[1]])
+        if direction == BEFORE:
+            ordering = 'search_rank DESC, id'
+        sql = (
+            f'SELECT id, search_rank FROM ('
+            f'SELECT post.id AS id, bm25({FTS_TABLE}) AS search_rank '
+            f'FROM {FTS_TABLE} '
+            f'JOIN posts_post post ON post.id = {FTS_TABLE}.rowid '
+            f'WHERE {" AND ".join(conditions)} '
+            f'ORDER BY {FTS_TABLE}.rowid DESC LIMIT %s) '
+            f'{seek}ORDER BY {ordering} LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit, offset])
+            rows = cursor.fetchall()
+        posts = Post.objects.for_feed().in_bulk(
+            [post_id for post_id, _ in rows]
+        )
+        page = []
+        for post_id, search_rank in rows:
+            if post_id in posts:
+                posts[post_id].search_rank = search_rank
+                page.append(posts[post_id])
+        return page
+
+
+def search_posts(query, group=None, author=None):
+    """Посты со всеми словами query в обход индекса, для баз без FTS5."""
+    posts = Post.objects.for_feed()
+    for word in WORD.findall(query):
+        posts = posts.filter(text__icontains=word)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts if WORD.search(query) else posts.none()
+
+
+def search_page(request, per_page=10, group=None, author=None):
+    """Страница результатов поиска по параметру q."""
+    query = request.GET.get('q', '')
+    if fts_available():
+        paginator = SearchPaginator(query, per_page, group, author)
+    else:
+        paginator = KeysetPaginator(
+            search_posts(query, group, author), per_page
+        )
+    return paginator.get_page(
+        request.GET.get('page'), request.GET.get('cursor')
+    )
@@ -0,0 +1,163 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.utils.page_cache import bump_generation_on_commit
+from . import counters, feeds, follows, thumbnails, trending
+from .models import Comment, Follow, Group, Post, TrendBucket, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Заводит счётчики новому пользователю."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_pages(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает страницы, на которых выводятся имена пользователей.
+
+    Обновление last_login при входе на страницы не влияет.
+    """
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_generation_on_commit('users')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, **kwargs):
+    """Сбрасывает страницы лент при создании, правке и удалении поста."""
+    bump_generation_on_commit('posts')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, **kwargs):
+    """Сбрасывает страницы, на которых выводятся группы."""
+    bump_generation_on_commit('groups')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, **kwargs):
+    """Сбрасывает страницы постов с комментариями."""
+    bump_generation_on_commit('comments')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, **kwargs):
+    """Сбрасывает страницы с числом подписчиков."""
+    bump_generation_on_commit('follows')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_following(sender, instance, **kwargs):
+    """Сбрасывает закешированные подписки пользователя после фиксации."""
+    transaction.on_commit(
+        partial(follows.forget_following, [instance.user_id])
+    )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if created:
+        transaction.on_commit(
+            partial(feeds.forget_recent_posts, instance.author_id)
+        )
+        feeds.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    """Обновляет счётчики постов автора и групп."""
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+    else:
+        loaded_group_id = getattr(instance, '_loaded_group_id', DEFERRED)
+        if loaded_group_id not in (DEFERRED, instance.group_id):
+            counters.bump_group(loaded_group_id, -1)
+            counters.bump_group(instance.group_id, 1)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def generate_thumbnails(sender, instance, created, **kwargs):
+    """Заказывает миниатюры новой картинки после фиксации транзакции."""
+    name = instance.image.name
+    if name and name != getattr(instance, '_loaded_image', None):
+        transaction.on_commit(partial(thumbnails.schedule, name))
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    """Убирает удалённый пост из кеша и счётчиков."""
+    transaction.on_commit(
+        partial(feeds.forget_recent_posts, instance.author_id)
+    )
+    counters.bump_user(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    """Увеличивает счётчик комментариев поста."""
+    if created:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев поста."""
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Добавляет в ленту посты автора, на которого подписались."""
+    if created:
+        feeds.backfill(instance.user_id, instance.author_id)
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_unfollowed(sender, instance, **kwargs):
+    """Убирает из ленты посты автора, от которого отписались."""
+    feeds.remove_author(instance.user_id, instance.author_id)
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def track_comment(sender, instance, created, **kwargs):
+    """Учитывает комментарий в популярности поста и его группы."""
+    if created:
+        trending.record(TrendBucket.POST, instance.post_id)
+        trending.record(TrendBucket.GROUP, instance.post.group_id)
+
+
+@receiver(post_save, sender=Post)
+def track_post(sender, instance, created, **kwargs):
+    """Учитывает новый пост в популярности его группы."""
+    if created:
+        trending.record(TrendBucket.GROUP, instance.group_id)
+
+
+@receiver(post_save, sender=Follow)
+def track_follow(sender, instance, created, **kwargs):
+    """Учитывает нового подписчика в популярности автора."""
+    if created:
+        trending.record(TrendBucket.AUTHOR, instance.author_id)
@@ -0,0 +1,180 @@
+"""Рекомендации «Кого читать».
+
+Граф подписок загружается в память разреженной матрицей смежности
+в формате CSR: для каждого пользователя непрерывный отрезок массива
+с id авторов, на которых он подписан, и такая же транспонированная
+матрица для подписчиков авторов. Массивы array по 4 байта на ребро,
+поэтому граф из миллиона подписок занимает около 8 МБ.
+
+Вес автора для пользователя складывается из двух сумм строк матрицы:
+- друзья друзей: сколько авторов из подписок пользователя подписаны
+  на этого автора (строка A·A);
+- общие подписки: на скольких из SUGGESTIONS_SIMILAR_USERS самых
+  похожих читателей (с наибольшим числом общих авторов) подписан этот
+  автор (строки A·Aᵀ, затем A).
+Строки суммируются Counter.update по срезам массивов, то есть в C.
+Пересчёт идёт пачками пользователей, лучшие SUGGESTIONS_COUNT авторов
+каждого сохраняются в Suggestion, а страница читает готовый список.
+"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import accumulate
+from operator import neg
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from core.utils.page_cache import bump_generation
+from .follows import ID_TYPECODE, chunks
+from .models import Follow, Suggestion
+
+# Сколько подписчиков автора просматривается при поиске похожих
+# читателей: у популярных авторов подписчиков слишком много, а вклад
+# каждого из них в похожесть мал.
+FOLLOWERS_SCAN = 1000
+
+
+def _zeros(size):
+    return array(ID_TYPECODE, bytes(size * array(ID_TYPECODE).itemsize))
+
+
+class FollowGraph:
+    """Граф подписок: матрица смежности и транспонированная в CSR."""
+
+    def __init__(self, edges, size):
+        """Строит граф по рёбрам (user_id, author_id), упорядоченным
+        по user_id; id пользователей меньше size."""
+        users = array(ID_TYPECODE)
+        self.authors = array(ID_TYPECODE)
+        counts = _zeros(size + 1)
+        for user_id, author_id in edges:
+            users.append(user_id)
+            self.authors.append(author_id)
+            counts[user_id + 1] += 1
+        self.author_ptr = array(ID_TYPECODE, accumulate(counts))
+
+        # Транспонирование сортировкой подсчётом: подписчики каждого
+        # автора остаются упорядоченными по id.
+        counts = _zeros(size + 1)
+        for author_id in self.authors:
+            counts[author_id + 1] += 1
+        self.follower_ptr = array(ID_TYPECODE, accumulate(counts))
+        position = array(ID_TYPECODE, self.follower_ptr)
+        self.followers = _zeros(len(self.authors))
+        for user_id, author_id in zip(users, self.authors):
+            self.followers[position[author_id]] = user_id
+            position[author_id] += 1
+
+    @classmethod
+    def load(cls, batch_size=10000):
+        """Загружает граф из таблицы Follow."""
+        last = Follow.objects.aggregate(
+            users=Max('user_id'), authors=Max('author_id')
+        )
+        size = max(last['users'] or 0, last['authors'] or 0) + 1
+        edges = Follow.objects.order_by('user_id', 'author_id').values_list(
+            'user_id', 'author_id'
+        ).iterator(chunk_size=batch_size)
+        return cls(edges, size)
+
+    @property
+    def size(self):
+        return len(self.author_ptr) - 1
+
+    def following(self, user_id):
+        """Авторы, на которых подписан пользователь (строка A)."""
+        return self.authors[
+            self.author_ptr[user_id]:self.author_ptr[user_id + 1]
+        ]
+
+    def followers_of(self, author_id, limit=None):
+        """Подписчики автора (строка Aᵀ), не больше limit."""
+        start = self.follower_ptr[author_id]
+        end = self.follower_ptr[author_id + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.followers[start:end]
+
+    def users(self):
+        """Пользователи, у которых есть подписки."""
+        return (user_id for user_id in range(self.size)
+                if self.author_ptr[user_id] != self.author_ptr[user_id + 1])
+
+    def scores(self, user_id, similar_users):
+        """Веса авторов-кандидатов для пользователя."""
+        following = self.following(user_id)
+        scores = Counter()
+        similar = Counter()
+        for author_id in following:
+            scores.update(self.following(author_id))
+            similar.update(self.followers_of(author_id, FOLLOWERS_SCAN))
+        del similar[user_id]
+        for _, reader_id in _top(similar, similar_users):
+            scores.update(self.following(-reader_id))
+        del scores[user_id]
+        for author_id in following:
+            del scores[author_id]
+        return scores
+
+    def suggest(self, user_id, count, similar_users):
+        """Лучшие count пар (author_id, вес) для пользователя."""
+        return [(-author_id, score) for score, author_id in _top(
+            self.scores(user_id, similar_users), count
+        )]
+
+
+def _top(counter, count):
+    """Лучшие count пар (вес, -id) из counter.
+
+    При равном весе выше стоит меньший id, чтобы порядок был устойчивым.
+    Пары сравниваются без функции key, то есть в C.
+    """
+    return heapq.nlargest(count, zip(counter.values(), map(neg, counter)))
+
+
+def rebuild(graph=None, chunk_size=1000):
+    """Пересчитывает рекомендации всех пользователей с подписками.
+
+    Каждая пачка из chunk_size пользователей заменяется в отдельной
+    транзакции. Страницы с блоком рекомендаций сбрасываются после
+    пересчёта. Возвращает число пользователей с рекомендациями.
+    """
+    if graph is None:
+        graph = FollowGraph.load()
+    count = settings.SUGGESTIONS_COUNT
+    similar_users = settings.SUGGESTIONS_SIMILAR_USERS
+    Suggestion.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    ).delete()
+    total = 0
+    for user_ids in chunks(graph.users(), chunk_size):
+        rows = [
+            Suggestion(user_id=user_id, author_id=author_id, score=score)
+            for user_id in user_ids
+            for author_id, score in graph.suggest(
+                user_id, count, similar_users
+            )
+        ]
+        with transaction.atomic():
+            Suggestion.objects.filter(user_id__in=user_ids).delete()
+            Suggestion.objects.bulk_create(rows)
+        total += len(user_ids)
+    bump_generation('follows')
+    return total
+
+
+def for_user(user):
+    """Рекомендации пользователю одним запросом, без авторов, на которых
+    он подписался после пересчёта."""
+    if not user.is_authenticated:
+        return []
+    return list(
+        Suggestion.objects.filter(user_id=user.pk).exclude(
+            author__following__user_id=user.pk
+        ).select_related('author').only(
+            'user', 'author__username', 'author__first_name',
+            'author__last_name',
+        ).order_by('-score', 'author_id')
+    )
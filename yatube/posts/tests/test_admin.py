@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.utils.paginate_page import EstimatedCountPaginator
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description='Описание',
+            )
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def create_posts(self, count, text='Пост'):
+        for number in range(count):
+            Post.objects.create(
+                author=User.objects.create_user(username=f'{text}{number}'),
+                group=self.groups[number % len(self.groups)],
+                text=f'{text} {number}',
+            )
+
+    def queries(self, params=None):
+        self.client.get(self.url, params)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк."""
+        self.create_posts(3, 'первый')
+        few = self.queries()
+        self.create_posts(30, 'второй')
+        self.assertEqual(self.queries(), few)
+
+    def test_search_uses_index(self):
+        """Поиск в админке находит посты по словам текста."""
+        self.create_posts(3, 'кот')
+        Post.objects.create(author=self.admin, text='Собака во дворе')
+        response = self.client.get(self.url, {'q': 'СОБАКА'})
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['Собака во дворе'],
+        )
+
+    def test_estimated_count(self):
+        """Большая таблица оценивается, выборка считается до предела."""
+        self.create_posts(6)
+        Post.objects.order_by('pk').first().delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 5)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 2)
+        paginator.estimate_above = 3
+        self.assertEqual(
+            paginator.count, Post.objects.order_by('-pk').first().pk
+        )
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group__isnull=False), 2
+        )
+        paginator.count_limit = 3
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(
+            list(paginator.page(1)),
+            list(Post.objects.filter(group__isnull=False)[:2]),
+        )
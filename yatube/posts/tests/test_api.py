@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows
+from ..models import Comment, Group, Post
+from .utils import commit_immediately
+
+User = get_user_model()
+
+
+@commit_immediately
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(15)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader,
+                text=f'Комментарий {number}',
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def collect(self, url, client=None, **params):
+        """Все страницы ленты по next_cursor."""
+        client = client or self.client
+        results = []
+        pages = 0
+        while True:
+            data = client.get(url, params).json()
+            results += data['results']
+            pages += 1
+            if not data['next_cursor']:
+                return results, pages
+            params['cursor'] = data['next_cursor']
+
+    def test_fields(self):
+        """Ответ содержит только запрошенные поля в порядке запроса."""
+        response = self.client.get(
+            reverse('api:index'), {'fields': 'text,author,id'}
+        )
+        self.assertEqual(response['Content-Type'], 'application/json')
+        first = response.json()['results'][0]
+        self.assertEqual(list(first), ['text', 'author', 'id'])
+        self.assertEqual(first, {
+            'text': 'Пост 14', 'author': 'author', 'id': self.posts[-1].pk,
+        })
+        response = self.client.get(reverse('api:index'))
+        self.assertEqual(
+            set(response.json()['results'][0]),
+            {'id', 'text', 'pub_date', 'author', 'group', 'group_title',
+             'image', 'comments_count'},
+        )
+
+    def test_unknown_fields(self):
+        """Неизвестное поле — ответ 400 со списком доступных полей."""
+        response = self.client.get(
+            reverse('api:index'), {'fields': 'text,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_cursor_pagination(self):
+        """Лента проходится по курсорам без пропусков и повторов."""
+        results, pages = self.collect(reverse('api:index'), fields='id')
+        self.assertEqual(pages, 2)
+        self.assertEqual(
+            [row['id'] for row in results],
+            [post.pk for post in reversed(self.posts)],
+        )
+        for cursor in ('испорчен', 'WyJhIiwgWyJ4IiwgMV1d'):
+            data = self.client.get(
+                reverse('api:index'), {'cursor': cursor}
+            ).json()
+            self.assertEqual(data['results'][0]['id'], self.posts[-1].pk)
+
+    def test_group_and_profile(self):
+        """Ленты группы и автора; неизвестные группа и автор — 404."""
+        results, _ = self.collect(
+            reverse('api:group_list', args=[self.group.slug]),
+            fields='group',
+        )
+        self.assertEqual(len(results), 7)
+        self.assertEqual({row['group'] for row in results}, {'test-slug'})
+        results, _ = self.collect(
+            reverse('api:profile', args=[self.author.username]),
+            fields='author',
+        )
+        self.assertEqual(len(results), 15)
+        for url in (reverse('api:group_list', args=['unknown']),
+                    reverse('api:profile', args=['unknown'])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_follow_index(self):
+        """Лента подписок доступна только авторизованному."""
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data['results'], [])
+        follows.follow(self.reader.pk, self.author.pk)
+        results, pages = self.collect(
+            url, client=self.reader_client, fields='id,text'
+        )
+        self.assertEqual(pages, 2)
+        self.assertEqual(
+            [row['id'] for row in results],
+            [post.pk for post in reversed(self.posts)],
+        )
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии, старые первыми."""
+        post = self.posts[0]
+        data = self.client.get(
+            reverse('api:post_detail', args=[post.pk]),
+            {'fields': 'text,comments_count,image'},
+        ).json()
+        self.assertEqual(
+            data, {'text': 'Пост 0', 'comments_count': 3, 'image': None}
+        )
+        data = self.client.get(
+            reverse('api:comments', args=[post.pk]), {'fields': 'text'}
+        ).json()
+        self.assertEqual(
+            [row['text'] for row in data['results']],
+            [comment.text for comment in self.comments],
+        )
+        for name in ('api:post_detail', 'api:comments'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=[0]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304 без запросов
+        к базе, пока лента не изменилась."""
+        url = reverse('api:index')
+        response = self.client.get(url, {'fields': 'id'})
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(
+            url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_count(self):
+        """Страница ленты — один запрос values() без объектов моделей."""
+        url = reverse('api:group_list', args=[self.group.slug])
+        with self.assertNumQueries(2):
+            # Группа по slug и страница постов.
+            self.client.get(url, {'fields': 'id,author,group_title'})
+
+    def test_comments_count_is_fresh(self):
+        """Новый комментарий меняет comments_count и ETag лент."""
+        post = self.posts[-1]
+        url = reverse('api:index')
+        params = {'fields': 'id,comments_count'}
+        response = self.client.get(url, params)
+        etag = response['ETag']
+        self.assertEqual(response.json()['results'][0]['comments_count'], 0)
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 1)
+        for url in (reverse('api:group_list', args=[self.group.slug]),
+                    reverse('api:profile', args=[self.author.username])):
+            with self.subTest(url=url):
+                response = self.client.get(url, params)
+                etag = response['ETag']
+                Comment.objects.create(
+                    post=post, author=self.reader, text='Ещё'
+                )
+                response = self.client.get(
+                    url, params, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,74 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for number in range(start, start + count):
+            Comment.objects.create(
+                post=self.post, text=f'Комментарий {number}',
+                author=User.objects.create_user(username=f'user{number}'),
+            )
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_post_detail_cost_is_bounded(self):
+        """Число запросов и комментариев на странице поста ограничено."""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        self.add_comments(2)
+        few, _ = self.queries(url)
+        self.add_comments(20)
+        many, response = self.queries(url)
+        self.assertEqual(many, few)
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, 'data-comments-url')
+
+    def test_fragment_pages_through_all_comments(self):
+        """Фрагменты по курсору отдают все комментарии по одному разу."""
+        self.add_comments(12)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
+        texts = [comment.text for comment in response.context['comments']]
+        content = response.content.decode()
+        while 'data-comments-url' in content:
+            url = re.search(r'data-comments-url="([^"]+)"', content)[1]
+            response = self.client.get(url.replace('&amp;', '&'))
+            self.assertTemplateNotUsed(response, 'base.html')
+            texts.extend(
+                comment.text for comment in response.context['comments']
+            )
+            content = response.content.decode()
+        self.assertEqual(
+            texts, [f'Комментарий {number}' for number in range(12)]
+        )
+
+    def test_fragment_for_missing_post(self):
+        """Фрагмент комментариев несуществующего поста — 404."""
+        response = self.client.get(reverse('posts:comments', args=(0,)))
+        self.assertEqual(response.status_code, 404)
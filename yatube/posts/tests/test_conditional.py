@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows
+from ..models import Comment, Group, Post
+from .utils import commit_immediately
+
+User = get_user_model()
+
+
+@commit_immediately
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('group',)),
+            reverse('posts:profile', args=('author',)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        )
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_not_modified_without_queries(self):
+        """Повторный анонимный запрос с ETag получает 304 без запросов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_users_get_own_etags(self):
+        """Анонимный и разные авторизованные пользователи не делят ETag."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)['ETag']
+                reader = self.reader_client.get(url)['ETag']
+                self.assertNotEqual(anonymous, reader)
+                self.assertNotEqual(reader, author_client.get(url)['ETag'])
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=anonymous
+                )
+                self.assertEqual(response.status_code, 200)
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=reader
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Новый пост и новый комментарий меняют ETag страниц."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Да')
+
+    def test_new_csrf_token_changes_etag(self):
+        """После нового входа (новый CSRF-токен) страница с формой
+        комментария отдаётся заново с новым токеном."""
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        etag = self.reader_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        old_token = self.reader_client.cookies[settings.CSRF_COOKIE_NAME]
+        del self.reader_client.cookies[settings.CSRF_COOKIE_NAME]
+        self.reader_client.logout()
+        self.reader_client.force_login(self.reader)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotEqual(
+            self.reader_client.cookies[settings.CSRF_COOKIE_NAME].value,
+            old_token.value,
+        )
+
+    def test_follow_changes_etag_of_cards_with_buttons(self):
+        """Подписка меняет ETag страниц с кнопками подписки на карточках
+        только у подписавшегося."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('group',)),
+        )
+        author_client = Client()
+        author_client.force_login(self.author)
+        etags = {url: self.reader_client.get(url)['ETag'] for url in urls}
+        author_etags = {url: author_client.get(url)['ETag'] for url in urls}
+        follows.follow(self.reader.pk, self.author.pk)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Отписаться')
+                response = author_client.get(
+                    url, HTTP_IF_NONE_MATCH=author_etags[url]
+                )
+                self.assertEqual(response.status_code, 304)
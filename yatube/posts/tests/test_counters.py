@@ -0,0 +1,100 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа-2',
+            slug='test-slug-2',
+            description='Тестовое описание-2',
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Посты учитываются в счётчиках автора и групп."""
+        post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 1)
+        post.delete()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group2.posts_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_missing_stats_are_recounted(self):
+        """Без строки счётчиков она создаётся пересчётом всех постов."""
+        Post.objects.create(author=self.author, text='Первый пост')
+        UserStats.objects.filter(user=self.author).delete()
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+
+    def test_comment_counter(self):
+        """Комментарии учитываются в счётчике поста."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            author=self.reader, post=post, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Подписки учитываются в счётчиках обоих пользователей."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_reconcile_command(self):
+        """Команда reconcile_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        Post.objects.create(
+            author=self.author, text='Второй пост', group=self.group
+        )
+        Comment.objects.create(author=self.reader, post=post, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=7)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.group.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,167 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def timeline(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.reader)
+            .order_by('-pub_date', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков, но не остальных."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(self.timeline(), [post.id])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.other).exists()
+        )
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        Post.objects.create(author=self.other, text='Чужой пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), [post.id for post in posts[::-1]])
+        follow.delete()
+        self.assertEqual(self.timeline(), [])
+
+    @override_settings(FOLLOW_TIMELINE_LENGTH=3)
+    def test_timeline_length_is_bounded(self):
+        """Лента обрезается до FOLLOW_TIMELINE_LENGTH последних постов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(5)
+        ]
+        self.assertEqual(self.timeline(), [post.id for post in posts[:1:-1]])
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает ленту по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline(), [post.id])
+
+    def test_follow_index_reads_timeline(self):
+        """Лента подписок строится по TimelineEntry с пагинацией."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(12)
+        ]
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), posts[:1:-1])
+        response = self.client.get(
+            reverse('posts:follow_index'),
+            {'cursor': page_obj.paginator.next_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), posts[1::-1])
+
+
+@override_settings(FEED_CELEBRITY_FOLLOWERS=2)
+class PullFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.fan, author=self.star)
+        cache.clear()
+
+    def test_celebrity_posts_are_pulled(self):
+        """Посты знаменитости не раскладываются, но попадают в ленту."""
+        posts = []
+        for number in range(8):
+            posts.append(Post.objects.create(
+                author=self.star, text=f'Пост звезды {number}'
+            ))
+            posts.append(Post.objects.create(
+                author=self.author, text=f'Пост автора {number}'
+            ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), posts[:5:-1])
+        response = self.client.get(
+            reverse('posts:follow_index'),
+            {'cursor': page_obj.paginator.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(list(second_page), posts[5::-1])
+        response = self.client.get(
+            reverse('posts:follow_index'),
+            {'cursor': second_page.paginator.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), posts[:5:-1])
+
+    def test_unfollowed_celebrity_is_not_pulled(self):
+        """После отписки посты знаменитости пропадают из ленты."""
+        Post.objects.create(author=self.star, text='Пост звезды')
+        Follow.objects.filter(user=self.reader, author=self.star).delete()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_celebrities_read_from_counters(self):
+        """Список знаменитостей берётся из счётчиков, без GROUP BY
+        по подпискам."""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(feeds.celebrity_ids(), {self.star.pk})
+        self.assertEqual(len(queries), 1)
+        self.assertIn('posts_userstats', queries[0]['sql'])
+
+    def test_former_celebrity_posts_are_fanned_in(self):
+        """Посты, вышедшие, пока автор был знаменитостью, раскладываются
+        в ленты, когда он опускается ниже порога."""
+        feeds.celebrity_ids()
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        cache.delete(feeds.CELEBRITIES_KEY)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
@@ -0,0 +1,151 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow, Post, TimelineEntry, UserStats
+from .utils import commit_immediately
+
+User = get_user_model()
+
+
+@commit_immediately
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_constraints(self):
+        """База не даёт подписаться дважды и подписаться на себя."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for user, author in ((self.reader, self.author),
+                             (self.author, self.author)):
+            with self.subTest(user=user, author=author):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(user=user, author=author)
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка ничего не меняет."""
+        self.assertTrue(follows.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.author.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.reader.pk, 0))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.post
+        ).exists())
+
+    def test_unfollow_is_idempotent(self):
+        """Повторная отписка ничего не меняет."""
+        follows.follow(self.reader.pk, self.author.pk)
+        self.assertTrue(follows.unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.unfollow(self.reader.pk, self.author.pk))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader
+        ).exists())
+
+    def test_follow_view_queries(self):
+        """Повторная подписка через view — один запрос к подпискам."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile_follow', args=('author',))
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        statements = [query['sql'] for query in context.captured_queries
+                      if 'posts_follow' in query['sql']]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_bulk_follow(self):
+        """Пачки подписок пропускают повторы, себя и неизвестных."""
+        User.objects.bulk_create(
+            User(username=f'fan_{number}') for number in range(5)
+        )
+        users = list(User.objects.filter(username__startswith='fan_'))
+        follows.follow(users[0].pk, self.author.pk)
+        pairs = [(user.pk, self.author.pk) for user in users]
+        pairs += [(self.author.pk, self.author.pk), (users[0].pk, 0)]
+        self.assertEqual(follows.follow_many(pairs, batch_size=2), 4)
+        self.assertEqual(self.stats(self.author).followers_count, 5)
+        self.assertEqual(self.stats(users[1]).following_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=self.post).count(), 5
+        )
+        self.assertEqual(follows.unfollow_many(pairs, batch_size=3), 5)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_import_command(self):
+        """Команда импортирует пары имён из CSV."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'follows.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('reader,author\nreader,nobody\nauthor,author\n')
+            call_command('import_follows', path, stdout=StringIO())
+            self.assertEqual(
+                list(Follow.objects.values_list('user', 'author')),
+                [(self.reader.pk, self.author.pk)],
+            )
+            call_command('import_follows', path, unfollow=True,
+                         stdout=StringIO())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_following_ids_cached(self):
+        """Подписки читаются из кеша и сбрасываются при изменении."""
+        follows.follow(self.reader.pk, self.author.pk)
+        reader = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(1):
+            ids = follows.following_ids(reader)
+        self.assertEqual(ids, {self.author.pk})
+        reader = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(follows.following_ids(reader), ids)
+        follows.unfollow(self.reader.pk, self.author.pk)
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(follows.following_ids(reader), frozenset())
+        follows.follow_many([(self.reader.pk, self.author.pk)])
+        reader = User.objects.get(pk=self.reader.pk)
+        self.assertEqual(follows.following_ids(reader), {self.author.pk})
+
+    def test_feed_follow_buttons(self):
+        """Кнопки подписки на карточках ленты не запрашивают подписки."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:index')
+        follow_url = reverse('posts:profile_follow', args=('author',))
+        self.assertContains(client.get(url), follow_url)
+        client.get(follow_url)
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertContains(
+            response, reverse('posts:profile_unfollow', args=('author',))
+        )
+        self.assertFalse([query for query in context.captured_queries
+                          if 'posts_follow' in query['sql']])
@@ -1,5 +1,7 @@
 import shutil
 import tempfile
+from io import BytesIO
+from PIL import Image
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client, override_settings
@@ -79,7 +81,7 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(
                 group=PostCreateFormTests.group.id,
                 text='Тестовый текст длинною более 20 символов',
-                image='posts/small.gif'
+                image='posts/small.jpg'
             ).exists()
         )
 
@@ -124,6 +126,31 @@ class PostCreateFormTests(TestCase):
                                  'post_id': f'{self.post.id}'
                              }))
 
+    @override_settings(POST_IMAGE_MAX_SIZE=1000, POST_IMAGE_QUALITY=80)
+    def test_large_image_normalized(self):
+        """Большая фотография уменьшается, поворачивается по EXIF
+        и сохраняется прогрессивным JPEG без EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Камера'
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 2000), (200, 40, 40)).save(
+            buffer, 'JPEG', exif=exif
+        )
+        uploaded = SimpleUploadedFile(
+            'large.jpeg', buffer.getvalue(), content_type='image/jpeg'
+        )
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с большой фотографией с телефона',
+            'image': uploaded,
+        })
+        post = Post.objects.get(image='posts/large.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (667, 1000))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertEqual(len(image.getexif()), 0)
+
 
 class CommentCreateFormTests(TestCase):
     @classmethod
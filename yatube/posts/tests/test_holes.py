@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core.utils.holes import placeholder, splice
+from core.utils.page_cache import cache_stats
+from ..models import Follow, Post
+from .utils import commit_immediately
+
+User = get_user_model()
+
+
+@commit_immediately
+class HolePunchingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_users_share_cached_body(self):
+        """Авторизованные посетители получают общее тело страницы
+        из кеша со своей шапкой."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertContains(response, 'Войти')
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Избранные авторы')
+        self.assertNotContains(response, 'Войти')
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(response, '<!--hole:')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(
+            cache_stats('index_page')['index_page'],
+            {'hits': 2, 'misses': 1},
+        )
+
+    def test_follow_button_per_user(self):
+        """Кнопка подписки на профиле своя у каждого посетителя."""
+        url = reverse('posts:profile', args=('author',))
+        self.assertNotContains(self.client.get(url), 'Подписаться')
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        self.assertNotContains(self.author_client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+
+    def test_placeholder_round_trip(self):
+        """Аргументы фрагмента не могут закрыть метку раньше времени."""
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        content = placeholder(
+            'posts/includes/follow_button.html',
+            {'author': 'a-->b', 'author_id': 0},
+        )
+        self.assertNotIn('-->b', content)
+        self.assertIn('profile/a--%3Eb/follow/', splice(request, content))
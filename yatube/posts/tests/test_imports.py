@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from .. import follows, imports
+from ..models import Group, Post, TimelineEntry, UserStats
+from ..search import SearchPaginator
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        follows.follow(cls.reader.pk, cls.author.pk)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def run_import(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_posts', path, *args,
+                     stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_jsonl(self):
+        """Посты вставляются пачками с датами из файла, а счётчики,
+        ленты подписчиков и поиск учитывают их."""
+        path = self.write('posts.jsonl', [
+            json.dumps({'text': f'Импортированный пост {number}',
+                        'author': 'author', 'group': 'test-slug',
+                        'pub_date': f'2020-01-{number + 1:02}T12:00:00'},
+                       ensure_ascii=False)
+            for number in range(5)
+        ])
+        stdout, stderr = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Импортировано постов: 5', stdout)
+        self.assertEqual(stderr, '')
+        posts = Post.objects.filter(author=self.author)
+        self.assertEqual(posts.count(), 5)
+        self.assertEqual(posts.first().pub_date, timezone.make_aware(
+            datetime(2020, 1, 5, 12)
+        ))
+        self.assertEqual(
+            {post.text: post.pub_date.day for post in posts},
+            {f'Импортированный пост {number}': number + 1
+             for number in range(5)},
+        )
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 5
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(
+            len(SearchPaginator('импортированный', 10).get_page()), 5
+        )
+
+    def test_posts_created_during_import_get_current_date(self):
+        """Импорт не отключает auto_now_add для остальных постов."""
+        created = []
+
+        def on_batch(count):
+            created.append(Post.objects.create(
+                author=self.reader, text='Пост из формы'
+            ))
+
+        rows = [imports.Row(
+            number=1, text='Старый пост', author='author', group=None,
+            pub_date=timezone.make_aware(datetime(2020, 1, 1)), image=None,
+        )]
+        started = timezone.now()
+        self.assertEqual(imports.import_posts(rows, on_batch=on_batch), 1)
+        self.assertEqual(
+            Post.objects.get(author=self.author).pub_date,
+            timezone.make_aware(datetime(2020, 1, 1)),
+        )
+        self.assertGreaterEqual(created[0].pub_date, started)
+
+    def test_csv_and_invalid_rows(self):
+        """Неверные строки пропускаются с номером строки в отчёте."""
+        path = self.write('posts.csv', [
+            'text,author,group,pub_date',
+            'Первый пост,author,,',
+            ',author,,',
+            'Пост без автора,unknown,,',
+            'Пост без группы,author,unknown,',
+            'Пост с датой,author,,вчера',
+            'Второй пост,author,test-slug,2021-05-01 10:00',
+        ])
+        stdout, stderr = self.run_import(path)
+        self.assertIn('Импортировано постов: 2, пропущено строк: 4', stdout)
+        for line in (3, 4, 5, 6):
+            self.assertIn(f'Строка {line}:', stderr)
+        self.assertEqual(
+            set(Post.objects.values_list('text', flat=True)),
+            {'Первый пост', 'Второй пост'},
+        )
+
+    def test_malformed_values(self):
+        """Невозможная дата и поля не строками пропускают только свою
+        строку."""
+        path = self.write('posts.jsonl', [
+            '{"text": "Пост", "author": "author", '
+            '"pub_date": "2020-13-45T00:00:00"}',
+            '{"text": "Пост", "author": 42}',
+            '{"text": ["Пост"], "author": "author"}',
+            '{"text": "Пост", "author": "author", "group": {"slug": 1}}',
+            '{"text": "Хороший пост", "author": "author"}',
+        ])
+        stdout, stderr = self.run_import(path)
+        self.assertIn('Импортировано постов: 1, пропущено строк: 4', stdout)
+        for line in (1, 2, 3, 4):
+            self.assertIn(f'Строка {line}:', stderr)
+
+    def test_interrupted_import_is_refreshed(self):
+        """Если импорт прервался, вставленные пачки всё равно учтены
+        в счётчиках и лентах."""
+        def rows():
+            for number in range(2):
+                yield imports.Row(number, f'Пост {number}', 'author', None,
+                                  timezone.now(), None)
+            raise OSError('Файл недоступен')
+
+        with self.assertRaises(OSError):
+            imports.import_posts(rows(), batch_size=2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    def test_create_missing(self):
+        """С --create-missing создаются авторы и группы."""
+        path = self.write('posts.jsonl', [
+            '{"text": "Пост нового автора", "author": "new", '
+            '"group": "new-group"}',
+            'не JSON',
+        ])
+        stdout, stderr = self.run_import(path, '--create-missing')
+        self.assertIn('Импортировано постов: 1', stdout)
+        self.assertIn('Строка 2:', stderr)
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.author.username, 'new')
+        self.assertFalse(post.author.has_usable_password())
+        self.assertEqual(post.group.slug, 'new-group')
+        self.assertEqual(UserStats.objects.get(user=post.author).posts_count,
+                         1)
+
+    def test_images(self):
+        """Картинки загружаются в пуле и сохраняются как из формы."""
+        source = os.path.join(self.directory, 'photo.png')
+        Image.new('RGB', (40, 20), 'red').save(source)
+        path = self.write('posts.jsonl', [
+            json.dumps({'text': 'Пост с картинкой', 'author': 'author',
+                        'image': source}, ensure_ascii=False),
+            json.dumps({'text': 'Пост с битой картинкой', 'author': 'author',
+                        'image': os.path.join(self.directory, 'missing')},
+                       ensure_ascii=False),
+        ])
+        stdout, stderr = self.run_import(path, '--image-workers', '2')
+        self.assertIn(
+            'Импортировано постов: 2, пропущено строк: 0, без картинки: 1',
+            stdout,
+        )
+        self.assertIn('импортирована без картинки', stderr)
+        self.assertIn('missing', stderr)
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertFalse(Post.objects.get(text='Пост с битой картинкой').image)
+
+    def test_unknown_format(self):
+        path = self.write('posts.txt', ['Пост'])
+        with self.assertRaises(CommandError):
+            self.run_import(path)
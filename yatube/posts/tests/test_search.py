@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.utils.paginate_page import decode_cursor
+from ..models import Group, Post
+from ..search import SEARCH_KEYS, SearchPaginator, match_query
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query, **filters):
+        paginator = SearchPaginator(query, 100, **filters)
+        return [post.id for post in paginator.get_page()]
+
+    def test_index_follows_create_edit_delete(self):
+        """Индекс обновляется при создании, правке и удалении поста."""
+        post = Post.objects.create(author=self.author, text='Кот на крыше')
+        self.assertEqual(self.found('кот'), [post.id])
+        post.text = 'Пёс во дворе'
+        post.save()
+        self.assertEqual(self.found('кот'), [])
+        self.assertEqual(self.found('ПЁС'), [post.id])
+        Post.objects.filter(pk=post.pk).update(text='Птица на ветке')
+        self.assertEqual(self.found('птица'), [post.id])
+        post.delete()
+        self.assertEqual(self.found('птица'), [])
+        created = Post.objects.bulk_create([
+            Post(author=self.author, text='Рыба в реке')
+        ])
+        self.assertEqual(len(self.found('рыба')), len(created))
+
+    def test_ranking_and_filters(self):
+        """Релевантные посты выше, фильтры по группе и автору работают."""
+        rare = Post.objects.create(
+            author=self.author, text='Длинный текст о разном, где море '
+            'упоминается один раз среди множества других слов и тем.'
+        )
+        often = Post.objects.create(
+            author=self.other, group=self.group, text='Море, море, море.'
+        )
+        Post.objects.create(author=self.author, text='Про горы')
+        self.assertEqual(self.found('море'), [often.id, rare.id])
+        self.assertEqual(self.found('море', group=self.group), [often.id])
+        self.assertEqual(self.found('море', author=self.author), [rare.id])
+        self.assertEqual(self.found('море горы'), [])
+
+    def test_keyset_pagination(self):
+        """Курсоры проходят все результаты без повторов и пропусков."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text='слово ' * (number % 5 + 1))
+            for number in range(25)
+        )
+        seen = []
+        cursor = None
+        pages = []
+        while True:
+            paginator = SearchPaginator('слово', 10)
+            page = paginator.get_page(cursor=cursor)
+            pages.append((cursor, [post.id for post in page]))
+            seen.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            cursor = paginator.next_cursor
+        self.assertEqual(
+            sorted(seen), sorted(Post.objects.values_list('id', flat=True))
+        )
+        self.assertEqual(len(seen), len(set(seen)))
+        paginator = SearchPaginator('слово', 10)
+        paginator.get_page(cursor=pages[2][0])
+        self.assertIsNotNone(
+            decode_cursor(paginator.previous_cursor, SEARCH_KEYS)
+        )
+        previous = SearchPaginator('слово', 10).get_page(
+            cursor=paginator.previous_cursor
+        )
+        self.assertEqual([post.id for post in previous], pages[1][1])
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные посты и ссылку дальше."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Пост {number}')
+            for number in range(12)
+        )
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'пост', 'group': 'group'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?q=%D0%BF%D0%BE%D1%81%D1%82&amp;group')
+        response = self.client.get(reverse('posts:search'), {'q': '"OR ('})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(match_query('"OR ('), '"or"')
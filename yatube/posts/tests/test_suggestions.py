@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import follows, suggestions
+from ..models import Suggestion
+
+User = get_user_model()
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.other, cls.a, cls.b, cls.c, cls.d, cls.e = (
+            User.objects.create_user(username=name) for name in (
+                'reader', 'other', 'a', 'b', 'c', 'd', 'e'
+            )
+        )
+        follows.follow_many([
+            (cls.reader.pk, cls.a.pk), (cls.reader.pk, cls.b.pk),
+            (cls.a.pk, cls.c.pk), (cls.b.pk, cls.c.pk), (cls.b.pk, cls.d.pk),
+            (cls.other.pk, cls.a.pk), (cls.other.pk, cls.b.pk),
+            (cls.other.pk, cls.e.pk),
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_graph(self):
+        """Граф хранит строки подписок и подписчиков."""
+        graph = suggestions.FollowGraph.load()
+        self.assertEqual(
+            sorted(graph.following(self.b.pk)), [self.c.pk, self.d.pk]
+        )
+        self.assertEqual(
+            sorted(graph.followers_of(self.a.pk)),
+            [self.reader.pk, self.other.pk],
+        )
+        self.assertEqual(list(graph.following(self.e.pk)), [])
+
+    def test_scores(self):
+        """Друзья друзей и подписки похожих читателей складываются."""
+        graph = suggestions.FollowGraph.load()
+        self.assertEqual(graph.suggest(self.reader.pk, 10, 20), [
+            (self.c.pk, 2), (self.d.pk, 1), (self.e.pk, 1),
+        ])
+        self.assertEqual(graph.suggest(self.reader.pk, 1, 20), [
+            (self.c.pk, 2),
+        ])
+
+    def test_rebuild_and_widget(self):
+        """Команда сохраняет рекомендации, блок их выводит."""
+        call_command('build_suggestions', chunk_size=2, stdout=StringIO())
+        self.assertEqual(
+            list(Suggestion.objects.filter(user=self.reader).order_by(
+                '-score', 'author_id'
+            ).values_list('author__username', flat=True)),
+            ['c', 'd', 'e'],
+        )
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Кого читать')
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=('d',))
+        )
+        follows.follow(self.reader.pk, self.d.pk)
+        self.assertEqual(
+            [suggestion.author.username
+             for suggestion in suggestions.for_user(self.reader)],
+            ['c', 'e'],
+        )
+        response = client.get(reverse('posts:profile', args=('a',)))
+        self.assertNotContains(
+            response, reverse('posts:profile_follow', args=('d',))
+        )
+
+    def test_rebuild_refreshes_pages(self):
+        """После пересчёта страница профиля с блоком отдаётся заново."""
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=('a',))
+        etag = client.get(url)['ETag']
+        suggestions.rebuild()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Кого читать')
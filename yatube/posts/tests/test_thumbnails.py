@@ -0,0 +1,225 @@
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core.utils.page_cache import get_generations
+from .. import thumbnails
+from ..models import Post
+from .utils import commit_immediately
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 800), (40, 80, 160)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generated_thumbnails_are_used_by_templates(self):
+        """Шаблон находит заранее созданную миниатюру, а не создаёт её."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        thumbnails.generate(post.image.name)
+        with mock.patch.object(
+            ThumbnailBackend, '_create_thumbnail',
+            side_effect=AssertionError('миниатюра создаётся в запросе'),
+        ):
+            for geometry, options in thumbnails.GEOMETRIES:
+                thumbnail = get_thumbnail(post.image, geometry, **options)
+                self.assertTrue(thumbnail.exists())
+
+    def test_page_urls_resolved_in_one_lookup(self):
+        """Адреса миниатюр страницы читаются из кеша одним get_many."""
+        for number in range(3):
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                image=make_image(f'{number}.jpg'),
+            )
+        Post.objects.create(author=self.author, text='Пост без картинки')
+        thumbnails.attach_urls(Post.objects.all())
+        posts = list(Post.objects.for_feed())
+        with mock.patch.object(
+            default.kvstore, 'get', side_effect=AssertionError('KV lookup')
+        ):
+            with mock.patch.object(
+                cache, 'get_many', wraps=cache.get_many
+            ) as get_many, mock.patch.object(cache, 'get') as get:
+                thumbnails.attach_urls(posts)
+            self.assertEqual(get_many.call_count, 1)
+            get.assert_not_called()
+            response = self.client.get(reverse('posts:index'))
+        with_image = [post for post in posts if post.image]
+        self.assertEqual(len(with_image), 3)
+        for post in with_image:
+            self.assertIn(post.thumbnail_url, response.content.decode())
+
+    def test_feed_card_has_responsive_sources(self):
+        """Карточка ленты выводит варианты миниатюры в srcset."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        thumbnails.generate(post.image.name)
+        content = self.client.get(reverse('posts:index')).content.decode()
+        for _, mime_type in thumbnails.FORMATS:
+            self.assertIn(f'<source type="{mime_type}"', content)
+        for width in thumbnails.FEED_WIDTHS:
+            self.assertIn(f' {width}w', content)
+
+    @mock.patch('posts.thumbnails.schedule')
+    def test_sources_appear_after_generation(self, schedule):
+        """Закешированные карточка и страница без srcset обновляются,
+        когда фоновая генерация создала варианты."""
+        Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            self.assertNotContains(self.client.get(url), '<source')
+        post = Post.objects.get()
+        thumbnails.generate(post.image.name)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), '<source')
+
+    @mock.patch('posts.thumbnails.schedule')
+    def test_expired_urls_keep_pages(self, schedule):
+        """Истёкшие адреса вариантов не сбрасывают страницы и не
+        заказывают генерацию заново: варианты отмечены у поста."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        thumbnails.generate(post.image.name)
+        generations = get_generations('posts')
+        thumbnails.generate(post.image.name)
+        self.assertEqual(get_generations('posts'), generations)
+        cache.delete_many([
+            thumbnails.url_key(geometry, options, post.image.name)
+            for geometry, options, _, _ in thumbnails.FEED_VARIANTS
+        ])
+        post = Post.objects.for_feed().get(pk=post.pk)
+        thumbnails.attach_urls([post])
+        self.assertEqual(
+            len(post.thumbnail_sources), len(thumbnails.FORMATS)
+        )
+        schedule.assert_not_called()
+        self.assertEqual(get_generations('posts'), generations)
+
+    @mock.patch('posts.thumbnails.schedule')
+    def test_new_image_resets_variants(self, schedule):
+        """У новой картинки поста вариантов ещё нет."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        thumbnails.generate(post.image.name)
+        post = Post.objects.get(pk=post.pk)
+        self.assertTrue(post.thumbnail_variants)
+        post.text = 'Правка без новой картинки'
+        post.save()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_variants)
+        post = Post.objects.get(pk=post.pk)
+        post.image = make_image('other.jpg')
+        post.save(update_fields=['image'])
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail_variants)
+
+    @mock.patch('posts.thumbnails.schedule')
+    def test_missing_variants_scheduled_once(self, schedule):
+        """Недостающие варианты заказываются один раз, без srcset."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        for _ in range(2):
+            post = Post.objects.get(pk=post.pk)
+            thumbnails.attach_urls([post])
+            self.assertTrue(post.thumbnail_url)
+            self.assertFalse(hasattr(post, 'thumbnail_sources'))
+        schedule.assert_called_once_with(post.image.name)
+
+    @mock.patch('posts.thumbnails.schedule')
+    @commit_immediately
+    def test_new_image_schedules_thumbnails(self, schedule):
+        """Миниатюры заказываются только для новой картинки."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        schedule.assert_called_once_with(post.image.name)
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Правка без новой картинки'
+        post.save()
+        Post.objects.create(author=self.author, text='Пост без картинки')
+        self.assertEqual(schedule.call_count, 1)
+        post.image = make_image('other.jpg')
+        post.save()
+        schedule.assert_called_with(post.image.name)
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_background_errors_are_logged(self):
+        """Ошибка генерации в фоновом пуле попадает в журнал."""
+        executor = ThreadPoolExecutor(1)
+        error = OSError('битый файл')
+        with mock.patch.object(thumbnails, 'pool', return_value=executor), \
+                mock.patch.object(thumbnails, '_executor', None), \
+                mock.patch.object(thumbnails, 'generate', side_effect=error), \
+                self.assertLogs('posts.thumbnails', 'ERROR') as logs:
+            thumbnails.schedule('posts/broken.jpg')
+            executor.shutdown()
+        self.assertIn('posts/broken.jpg: битый файл', logs.output[0])
+
+    def test_generate_thumbnails_command(self):
+        """Команда создаёт миниатюры для всех картинок постов."""
+        for number in range(3):
+            Post.objects.create(
+                author=self.author, text=f'Пост {number}',
+                image=make_image(f'{number}.jpg'),
+            )
+        out = StringIO()
+        call_command('generate_thumbnails', workers=0, stdout=out)
+        self.assertIn('Обработано картинок: 3, с ошибками: 0', out.getvalue())
+
+    def test_thumbnail_savings_command(self):
+        """Отчёт сравнивает варианты с текущей миниатюрой."""
+        Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        out = StringIO()
+        call_command('thumbnail_savings', workers=0, stdout=out)
+        self.assertIn('Картинок: 1, с ошибками: 0', out.getvalue())
+        self.assertEqual(
+            out.getvalue().count('экономия'), len(thumbnails.FEED_VARIANTS)
+        )
@@ -0,0 +1,122 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import follows, trending
+from ..models import Comment, Group, Post, TrendBucket
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Обсуждаемый пост', group=cls.group
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.author, text='Тихий пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_events_are_counted(self):
+        """Комментарии, посты и подписки увеличивают счётчики."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        follows.follow(self.reader.pk, self.author.pk)
+        self.assertEqual(trending.ranking(TrendBucket.POST, 'hour'), [
+            (self.post.pk, 12),
+        ])
+        # Новый пост группы и комментарий к нему.
+        self.assertEqual(trending.ranking(TrendBucket.GROUP, 'hour'), [
+            (self.group.pk, 24),
+        ])
+        self.assertEqual(trending.ranking(TrendBucket.AUTHOR, 'day'), [
+            (self.author.pk, 288),
+        ])
+
+    def test_decay_and_window(self):
+        """Старые события весят меньше и выпадают из окна."""
+        now = time.time()
+        step = settings.TRENDING_BUCKET_SECONDS
+        for _ in range(3):
+            trending.record(TrendBucket.POST, self.post.pk, now - 50 * 60)
+        trending.record(TrendBucket.POST, self.quiet_post.pk, now)
+        trending.record(TrendBucket.POST, self.quiet_post.pk, now - 2 * 3600)
+        self.assertEqual(
+            trending.ranking(TrendBucket.POST, 'hour', now),
+            [(self.quiet_post.pk, 12), (self.post.pk, 3 * 2)],
+        )
+        self.assertEqual(
+            trending.ranking(TrendBucket.POST, 'day', now),
+            [(self.post.pk, 3 * 278), (self.quiet_post.pk, 288 + 264)],
+        )
+        trending.prune(now + 46 * 3600 + step)
+        self.assertEqual(
+            trending.ranking(TrendBucket.POST, 'day', now),
+            [(self.post.pk, 3 * 278), (self.quiet_post.pk, 288)],
+        )
+
+    def test_incremental_refresh(self):
+        """Инкрементальный пересчёт совпадает с полным."""
+        rng = random.Random(1)
+        step = settings.TRENDING_BUCKET_SECONDS
+        now = time.time() - 30 * 3600
+        for minute in range(0, 30 * 60, 7):
+            moment = now + minute * 60
+            for _ in range(rng.randint(0, 3)):
+                trending.record(
+                    TrendBucket.POST, rng.randint(1, 30), moment
+                )
+            if minute % 3 == 0:
+                for window in trending.WINDOWS:
+                    self.assertEqual(
+                        trending.refresh(TrendBucket.POST, window, moment),
+                        trending.ranking(TrendBucket.POST, window, moment),
+                    )
+        # Пропуск дольше окна: состояние считается заново.
+        moment = now + 31 * 3600 + step
+        self.assertEqual(
+            trending.refresh(TrendBucket.POST, 'hour', moment),
+            trending.ranking(TrendBucket.POST, 'hour', moment),
+        )
+
+    def test_page(self):
+        """Раздел выводит рейтинг из кеша."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        url = reverse('posts:trending')
+        response = self.client.get(url, {'window': 'day'})
+        self.assertEqual(response.context['window'], 'day')
+        self.assertEqual(response.context['posts'], [self.post])
+        self.assertEqual(response.context['groups'], [self.group])
+        self.assertContains(response, 'Обсуждаемый пост')
+        Comment.objects.create(
+            post=self.quiet_post, author=self.reader, text='Комментарий'
+        )
+        response = self.client.get(url, {'window': 'unknown'})
+        self.assertEqual(response.context['window'], 'hour')
+        with self.assertNumQueries(2):
+            # Посты и группы по id из закешированного рейтинга;
+            # подписок не было, авторов в рейтинге нет.
+            response = self.client.get(url)
+        self.assertEqual(
+            response.context['posts'], [self.post, self.quiet_post]
+        )
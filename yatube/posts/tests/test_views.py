@@ -1,13 +1,23 @@
+import base64
+import json
 import shutil
 import tempfile
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client, override_settings
-from ..models import Group, Post, Follow
+from ..models import Comment, Group, Post, Follow
+from .utils import commit_immediately
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.utils.page_cache import cache_stats, get_generations
+from unittest import mock
+from core.utils.paginate_page import (
+    KeysetPaginator, decode_cursor, encode_cursor,
+)
 
 User = get_user_model()
 
@@ -15,6 +25,7 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@commit_immediately
 class PostTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -213,21 +224,65 @@ class PostTests(TestCase):
 
     def test_index_page_caches(self):
         """Кеширование на главной странице работает правильно."""
-        Post.objects.create(
+        post = Post.objects.create(
             author=self.img_user,
             text='Тестовый пост для кеширования',
         )
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertContains(response, 'Тестовый пост для кеширования')
-        Post.objects.filter(
-            text='Тестовый пост для кеширования'
-        ).delete()
+        # update() не посылает сигналов, поэтому страница остаётся в кеше.
+        Post.objects.filter(pk=post.pk).update(text='Изменённый текст')
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertContains(response, 'Тестовый пост для кеширования')
         cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotContains(response, 'Тестовый пост для кеширования')
 
+    def test_index_page_cache_invalidation(self):
+        """Создание и удаление поста сразу сбрасывают кеш главной."""
+        self.authorized_client.get(reverse('posts:index'))
+        post = Post.objects.create(
+            author=self.img_user,
+            text='Тестовый пост для кеширования',
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый пост для кеширования')
+        post.delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Тестовый пост для кеширования')
+        stats = cache_stats('index_page')['index_page']
+        self.assertEqual(stats, {'hits': 0, 'misses': 3})
+        self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(cache_stats('index_page')['index_page']['hits'], 1)
+
+    def test_group_rename_invalidates_pages(self):
+        """Переименование группы сбрасывает кеш страниц с постами."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.group2.title = 'Новое название группы'
+        self.group2.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое название группы')
+        self.group2.title = 'Тестовая группа-2'
+        self.group2.save()
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста кешируется между лентами и сбрасывается правкой."""
+        self.authorized_client.get(reverse('posts:index'))
+        # update() не меняет версию поста: карточка берётся из кеша.
+        Post.objects.filter(pk=self.post.pk).update(text='Текст без версии')
+        group_url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        response = self.authorized_client.get(group_url)
+        self.assertContains(response, self.post.text)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={
+                'text': 'Отредактированный текст поста',
+                'group': self.group.pk,
+            },
+        )
+        response = self.authorized_client.get(group_url)
+        self.assertContains(response, 'Отредактированный текст поста')
+
     def test_group_list_page_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
         response = (self.authorized_client.
@@ -341,3 +396,197 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']), 10)
                 response = self.client.get(value + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_paginator(self):
+        """Курсорная пагинация отдаёт следующую и предыдущую страницы."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        first_page = self.client.get(url).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        second_page = self.client.get(
+            url, {'cursor': first_page.paginator.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        posts = list(first_page) + list(second_page)
+        self.assertEqual(
+            posts, list(Post.objects.order_by('-pub_date', '-id'))
+        )
+        previous_page = self.client.get(
+            url, {'cursor': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertTrue(previous_page.has_next())
+
+    def test_cursor_paginator_broken_cursor(self):
+        """Испорченный курсор открывает первую страницу."""
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        response = self.client.get(url, {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_paginator_forged_cursor(self):
+        """Подделанный курсор с неподходящими значениями ключа
+        открывает первую страницу, огромный номер — последнюю допустимую."""
+        post = Post.objects.first()
+        forged = [
+            ['a', ['x', 1]],
+            ['a', [1]],
+            ['a', [None, None]],
+            ['a', ['2020-13-45T00:00:00', 1]],
+            ['a', ['2020-01-01T00:00:00', 1]],
+            ['a', ['2020-01-01T00:00:00+00:00', '1']],
+            ['a', ['2020-01-01T00:00:00+00:00', 1, 2]],
+            ['a', {'pub_date': 1}],
+        ]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        for url in urls:
+            for values in forged:
+                cursor = base64.urlsafe_b64encode(
+                    json.dumps(values).encode()
+                ).decode()
+                with self.subTest(url=url, cursor=values):
+                    cache.clear()
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+        self.assertIsNone(decode_cursor(cursor))
+        urls += (reverse('posts:search'),)
+        for url in urls:
+            for number in (10 ** 20, 10 ** 21, 10 ** 22):
+                with self.subTest(url=url, page=number):
+                    cache.clear()
+                    response = self.client.get(
+                        url, {'page': number, 'q': 'Тестовый'}
+                    )
+                    self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['page_obj'].number,
+            KeysetPaginator.max_number,
+        )
+        self.assertEqual(
+            decode_cursor(encode_cursor('a', (post.pub_date, post.id))),
+            ('a', [post.pub_date, post.id]),
+        )
+
+
+class IndexViewTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_index(self):
+        """Главная страница без постов отдаёт 404."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_index_reads_only_one_page(self):
+        """Главная страница выбирает из таблицы постов только одну страницу."""
+        for number in range(15):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 10)
+        post_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_queries), 1)
+        self.assertIn('LIMIT 11', post_queries[0])
+
+    def test_page_invalidated_after_commit(self):
+        """Страница сбрасывается только после фиксации транзакции:
+        до неё параллельный запрос закешировал бы старые данные под
+        новым поколением."""
+        Post.objects.create(author=self.user, text='Первый пост')
+        url = reverse('posts:index')
+        self.client.get(url)
+        generations = get_generations('posts')
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            Post.objects.create(author=self.user, text='Второй пост')
+        self.assertEqual(get_generations('posts'), generations)
+        self.assertNotContains(self.client.get(url), 'Второй пост')
+        for (func, *_), _ in on_commit.call_args_list:
+            func()
+        self.assertNotEqual(get_generations('posts'), generations)
+        self.assertContains(self.client.get(url), 'Второй пост')
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов страниц со списками постов не зависит от постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            author = User.objects.create_user(username=f'author_{number}')
+            Follow.objects.create(user=cls.reader, author=author)
+            for post_author in (author, cls.author):
+                Post.objects.create(
+                    author=post_author,
+                    text=f'Пост номер {number}',
+                    group=cls.group,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_query_budget(self):
+        """Страницы лент укладываются в бюджет запросов."""
+        budgets = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}): 2,
+            reverse('posts:profile', kwargs={'username': 'author'}): 2,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_follow_index_query_budget(self):
+        """Лента подписок укладывается в бюджет запросов."""
+        # Сессия, пользователь, список знаменитостей, лента, посты
+        # и рекомендации «Кого читать».
+        with self.assertNumQueries(6):
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_post_detail_query_budget(self):
+        """Страница поста: пост с автором, счётчиками и группой одним
+        запросом и ещё один запрос на страницу комментариев."""
+        post = Post.objects.filter(author=self.author).first()
+        for number in range(3):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {number}'
+            )
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.id})
+            )
+        self.assertContains(response, 'Всего постов автора:  <span >12<')
+        self.assertContains(response, 'Тестовая группа')
+        self.assertEqual(len(response.context['comments']), 3)
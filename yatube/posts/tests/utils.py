@@ -0,0 +1,8 @@
+from unittest import mock
+
+# TestCase не фиксирует транзакцию, и обработчики on_commit в нём
+# не вызываются. Тесты сброса кешей выполняют их сразу, как после
+# фиксации.
+commit_immediately = mock.patch(
+    'django.db.transaction.on_commit', new=lambda func, using=None: func()
+)
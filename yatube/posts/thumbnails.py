@@ -0,0 +1,212 @@
+"""Генерация миниатюр картинок постов вне запроса.
+
+Тег {% thumbnail %} создаёт миниатюру при первом показе: первый зритель
+нового поста ждёт декодирования и ресайза, а всплеск трафика может
+запустить несколько одинаковых генераций. Поэтому после сохранения поста
+с новой картинкой миниатюры всех GEOMETRIES создаются заранее в пуле
+процессов. Если фоновая генерация не удалась, шаблон по-прежнему создаст
+миниатюру сам.
+
+Для карточек ленты создаются варианты нескольких ширин в JPEG и, если
+Pillow собран с её поддержкой, в WebP: браузер выбирает подходящий
+по srcset внутри <picture>.
+
+Адреса готовых миниатюр хранятся в общем кеше по имени картинки:
+attach_urls получает их для всей страницы ленты одним get_many вместо
+обращения к KV-хранилищу sorl из каждой карточки. Что варианты созданы,
+помнит сам пост (Post.thumbnail_variants), поэтому истёкшие адреса
+не вызывают повторной генерации и сброса страниц.
+
+Ошибки фоновой генерации пишутся в журнал posts.thumbnails.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from core.utils.page_cache import bump_generation
+
+# Геометрия тега {% thumbnail %} карточки и её пропорции для вариантов.
+FEED_GEOMETRY = ('960x339', {'crop': 'center', 'upscale': True})
+FEED_WIDTHS = (480, 720, 960, 1440)
+FEED_HEIGHT_RATIO = 339 / 960
+
+# Форматы вариантов в порядке предпочтения браузером.
+FORMATS = tuple(
+    (image_format, mime_type)
+    for image_format, mime_type in (
+        ('WEBP', 'image/webp'), ('JPEG', 'image/jpeg')
+    )
+    if image_format != 'WEBP' or features.check('webp')
+)
+
+
+def _variants():
+    variants = []
+    for image_format, mime_type in FORMATS:
+        for width in FEED_WIDTHS:
+            height = round(width * FEED_HEIGHT_RATIO)
+            options = dict(FEED_GEOMETRY[1], format=image_format)
+            variants.append((f'{width}x{height}', options, mime_type, width))
+    return tuple(variants)
+
+
+# Варианты карточки: (геометрия, параметры, MIME-тип, ширина).
+FEED_VARIANTS = _variants()
+
+# Геометрии и параметры всех миниатюр, которые создаются заранее.
+# Вариант 960x339 в JPEG совпадает с FEED_GEOMETRY.
+GEOMETRIES = (FEED_GEOMETRY,) + tuple(
+    (geometry, options) for geometry, options, _, _ in FEED_VARIANTS
+    if (geometry, options['format']) != (FEED_GEOMETRY[0], 'JPEG')
+)
+
+URL_KEY = 'thumbnail_url:{}:{}:{}'
+URL_TIMEOUT = 24 * 60 * 60
+PENDING_KEY = 'thumbnail_pending:{}'
+PENDING_TIMEOUT = 60
+
+_executor = None
+_executor_pid = None
+
+logger = logging.getLogger(__name__)
+
+
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def pool(workers):
+    """Пул процессов с настроенным Django.
+
+    Процессы запускаются через spawn: унаследованные через fork
+    соединения с базой использовать нельзя.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup_worker,
+    )
+
+
+def url_key(geometry, options, name):
+    """Ключ кеша адреса миниатюры картинки name."""
+    return URL_KEY.format(geometry, options.get('format', 'JPEG'), name)
+
+
+def generate(name):
+    """Создаёт миниатюры всех GEOMETRIES для картинки name.
+
+    Готовность вариантов отмечается у постов в базе. Страницы лент
+    сбрасываются, только когда варианты картинки появились впервые:
+    закешированные до этого карточки выведены без srcset.
+    """
+    from .models import Post
+
+    urls = {}
+    for geometry, options in GEOMETRIES:
+        thumbnail = get_thumbnail(name, geometry, **options)
+        urls[url_key(geometry, options, name)] = thumbnail.url
+    cache.set_many(urls, URL_TIMEOUT)
+    if Post.objects.filter(
+        image=name, thumbnail_variants=False
+    ).update(thumbnail_variants=True):
+        bump_generation('posts')
+    return name
+
+
+def _sources(variant_urls):
+    sources = {}
+    for (_, _, mime_type, width), url in zip(FEED_VARIANTS, variant_urls):
+        sources.setdefault(mime_type, []).append(f'{url} {width}w')
+    return [(mime_type, ', '.join(srcset))
+            for mime_type, srcset in sources.items()]
+
+
+def attach_urls(posts):
+    """Проставляет постам с картинкой адреса миниатюр.
+
+    thumbnail_url — миниатюра FEED_GEOMETRY, thumbnail_sources — пары
+    (MIME-тип, srcset) для <picture>. Адреса читаются одним get_many;
+    вытесненные из кеша разрешаются через sorl, как в теге шаблона.
+    Варианты поста без отметки post.thumbnail_variants заказываются
+    в фоне, а пока их нет, карточка выводится без srcset.
+    """
+    posts = [post for post in posts if post.image]
+    if not posts:
+        return
+    geometry, options = FEED_GEOMETRY
+    keys = {
+        post.id: [url_key(geometry, options, post.image.name)] + [
+            url_key(variant, variant_options, post.image.name)
+            for variant, variant_options, _, _ in FEED_VARIANTS
+        ]
+        for post in posts
+    }
+    urls = cache.get_many(
+        [key for post_keys in keys.values() for key in post_keys]
+    )
+    missing = {}
+
+    def resolve(post, key, geometry, options):
+        if key not in urls:
+            missing[key] = get_thumbnail(post.image, geometry, **options).url
+            urls[key] = missing[key]
+        return urls[key]
+
+    for post in posts:
+        key, *variant_keys = keys[post.id]
+        post.thumbnail_url = resolve(post, key, geometry, options)
+        if post.thumbnail_variants:
+            post.thumbnail_sources = _sources([
+                resolve(post, variant_key, variant, variant_options)
+                for variant_key, (variant, variant_options, _, _)
+                in zip(variant_keys, FEED_VARIANTS)
+            ])
+        elif cache.add(
+            PENDING_KEY.format(post.image.name), 1, PENDING_TIMEOUT
+        ):
+            schedule(post.image.name)
+    if missing:
+        cache.set_many(missing, URL_TIMEOUT)
+
+
+def try_generate(name):
+    """Как generate, но возвращает текст ошибки вместо исключения."""
+    try:
+        generate(name)
+    except Exception as error:
+        return f'{name}: {error}'
+    return None
+
+
+def _log_error(future):
+    """Пишет в журнал ошибку фоновой генерации миниатюр."""
+    try:
+        error = future.result()
+    except Exception:
+        logger.exception('Фоновая генерация миниатюр не выполнена.')
+        return
+    if error:
+        logger.error('Не удалось создать миниатюры %s', error)
+
+
+def schedule(name):
+    """Отправляет генерацию миниатюр name в фоновый пул.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу.
+    """
+    global _executor, _executor_pid
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name)
+        return
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = pool(settings.THUMBNAIL_WORKERS)
+        _executor_pid = os.getpid()
+    _executor.submit(try_generate, name).add_done_callback(_log_error)
@@ -0,0 +1,183 @@
+"""Раздел «Популярное».
+
+Комментарии, новые посты и подписки увеличивают счётчики TrendBucket
+за текущий интервал времени: пост — по его комментариям, группа — по
+новым постам и комментариям к ним, автор — по новым подписчикам.
+Счётчики меняются из обработчиков сигналов одним UPDATE, поэтому
+для рейтинга не нужно группировать таблицу комментариев.
+
+Рейтинг за окно (час или сутки) — сумма счётчиков интервалов окна
+с линейным затуханием: самый новый интервал весит столько, сколько
+интервалов в окне, самый старый — 1. Веса поддерживаются
+инкрементально (refresh): пересчёт не чаще раза в
+TRENDING_CACHE_TIMEOUT секунд читает только интервалы, появившиеся
+и выпавшие из окна с прошлого раза, а между пересчётами рейтинг
+берётся из кеша.
+"""
+import heapq
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from .models import TrendBucket
+
+WINDOWS = {
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+}
+DEFAULT_WINDOW = 'hour'
+TRENDING_KEY = 'trending:{}:{}'
+STATE_KEY = 'trending:state:{}:{}'
+
+
+def current_bucket(now=None):
+    """Номер интервала, в который попадает момент now."""
+    if now is None:
+        now = time.time()
+    return int(now // settings.TRENDING_BUCKET_SECONDS)
+
+
+def record(kind, object_id, now=None):
+    """Учитывает событие объекта в текущем интервале.
+
+    Строка интервала создаётся с нулём и увеличивается тем же UPDATE,
+    поэтому одновременные первые события не теряются.
+    """
+    if object_id is None:
+        return
+    bucket = TrendBucket.objects.filter(
+        kind=kind, object_id=object_id, bucket=current_bucket(now)
+    )
+    if not bucket.update(count=F('count') + 1):
+        TrendBucket.objects.bulk_create(
+            [TrendBucket(kind=kind, object_id=object_id,
+                         bucket=current_bucket(now))],
+            ignore_conflicts=True,
+        )
+        bucket.update(count=F('count') + 1)
+
+
+def _window(window):
+    return WINDOWS[window] // settings.TRENDING_BUCKET_SECONDS
+
+
+def ranking(kind, window, now=None):
+    """Пары (object_id, вес) лучших объектов за окно — полным расчётом
+    по всем интервалам окна."""
+    since = current_bucket(now) - _window(window)
+    return list(
+        TrendBucket.objects.filter(kind=kind, bucket__gt=since)
+        .values('object_id')
+        .annotate(score=Sum(F('count') * (F('bucket') - since)))
+        .order_by('-score', 'object_id')
+        .values_list('object_id', 'score')[:settings.TRENDING_COUNT]
+    )
+
+
+def _scratch(kind, current, since):
+    """Состояние рейтинга, посчитанное заново по всему окну."""
+    totals = {
+        object_id: [total, weighted]
+        for object_id, total, weighted in TrendBucket.objects.filter(
+            kind=kind, bucket__gt=since, bucket__lte=current
+        ).values('object_id').annotate(
+            total=Sum('count'), weighted=Sum(F('count') * F('bucket'))
+        ).values_list('object_id', 'total', 'weighted')
+    }
+    opened = dict(TrendBucket.objects.filter(
+        kind=kind, bucket=current
+    ).values_list('object_id', 'count'))
+    return {'bucket': current, 'totals': totals, 'open': opened}
+
+
+def _advance(kind, state, current, since):
+    """Сдвигает состояние к интервалу current.
+
+    Читаются только интервалы с прошлого пересчёта (последний из них
+    тогда был ещё открыт, его уже учтённая часть вычитается)
+    и интервалы, выпавшие из окна.
+    """
+    totals = state['totals']
+    opened = state['open']
+
+    def add(object_id, bucket, count):
+        sums = totals.setdefault(object_id, [0, 0])
+        sums[0] += count
+        sums[1] += count * bucket
+        if not sums[0]:
+            del totals[object_id]
+
+    rows = TrendBucket.objects.filter(
+        kind=kind, bucket__gte=state['bucket'], bucket__lte=current
+    ).values_list('object_id', 'bucket', 'count')
+    new_opened = {}
+    for object_id, bucket, count in rows:
+        if bucket == current:
+            new_opened[object_id] = count
+        if bucket == state['bucket']:
+            count -= opened.get(object_id, 0)
+        add(object_id, bucket, count)
+    old_since = state['bucket'] - (current - since)
+    expired = TrendBucket.objects.filter(
+        kind=kind, bucket__gt=old_since, bucket__lte=since
+    ).values_list('object_id', 'bucket', 'count')
+    for object_id, bucket, count in expired:
+        add(object_id, bucket, -count)
+    return {'bucket': current, 'totals': totals, 'open': new_opened}
+
+
+def refresh(kind, window, now=None):
+    """Пересчитывает рейтинг по изменениям с прошлого пересчёта.
+
+    Для каждого объекта окна в кеше хранятся сумма счётчиков S0
+    и сумма счётчиков, умноженных на номер интервала, S1; вес объекта
+    равен S1 - since * S0. При сдвиге окна суммы поправляются только
+    новыми и выпавшими интервалами. Состояние живёт в кеше не дольше
+    окна, после чего считается заново полным запросом.
+    """
+    current = current_bucket(now)
+    since = current - _window(window)
+    key = STATE_KEY.format(kind, window)
+    state = cache.get(key)
+    if state is None or not since < state['bucket'] <= current:
+        state = _scratch(kind, current, since)
+    else:
+        state = _advance(kind, state, current, since)
+    cache.set(key, state, WINDOWS[window])
+    best = heapq.nlargest(settings.TRENDING_COUNT, (
+        (weighted - since * total, -object_id)
+        for object_id, (total, weighted) in state['totals'].items()
+    ))
+    return [(-object_id, score) for score, object_id in best]
+
+
+def prune(now=None):
+    """Удаляет интервалы старше двух самых длинных окон.
+
+    Запас в одно окно оставлен, чтобы пересчёт успел вычесть интервалы,
+    выпавшие из окна.
+    """
+    since = current_bucket(now) - 2 * max(map(_window, WINDOWS))
+    for kind, _ in TrendBucket.KINDS:
+        TrendBucket.objects.filter(kind=kind, bucket__lte=since).delete()
+
+
+def top(kind, window):
+    """Закешированный рейтинг объектов kind за окно window."""
+    key = TRENDING_KEY.format(kind, window)
+    ranked = cache.get(key)
+    if ranked is None:
+        ranked = refresh(kind, window)
+        if window == max(WINDOWS, key=WINDOWS.get):
+            prune()
+        cache.set(key, ranked, settings.TRENDING_CACHE_TIMEOUT)
+    return ranked
+
+
+def ordered(queryset, ranked):
+    """Объекты queryset в порядке рейтинга; удалённые пропускаются."""
+    found = queryset.in_bulk([object_id for object_id, _ in ranked])
+    return [found[object_id] for object_id, _ in ranked
+            if object_id in found]
@@ -1,29 +1,59 @@
-from django.shortcuts import (
-    render, get_object_or_404, get_list_or_404, redirect
-)
-from .models import Post, Group, User, Follow
+from django.db import transaction
+from django.http import Http404
+from django.utils.http import urlencode
+from django.shortcuts import render, get_object_or_404, redirect
+from .models import Comment, Post, Group, TrendBucket, User
 from .forms import PostForm, CommentForm
 from django.contrib.auth.decorators import login_required
-from core.utils.paginate_page import paginator_page
-from django.views.decorators.cache import cache_page
+from core.utils.paginate_page import (
+    COMMENT_KEYS, KeysetPaginator, paginator_page,
+)
+from .feeds import follow_page
+from . import follows, suggestions, trending
+from .search import search_page
+from . import thumbnails
+from core.utils.holes import hole_context
+from core.utils.page_cache import (
+    cache_page_versioned, page_etag, punch_holes,
+)
+from django.conf import settings
+
+
+def following_state(request):
+    """Подписки посетителя для ETag страниц с кнопками подписки."""
+    return ','.join(map(str, sorted(follows.following_ids(request.user))))
 
 
-@cache_page(20, key_prefix="index_page")
+@page_etag(('posts', 'groups', 'users'), following_state)
+@punch_holes
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'index_page', ('posts', 'groups', 'users')
+)
 def index(request):
     """Представление главной страницы."""
-    post_list = get_list_or_404(Post)
+    post_list = Post.objects.for_feed()
     page_obj = paginator_page(post_list, request)
+    # Пустую таблицу проверяем только когда пуста сама страница.
+    if not page_obj.object_list and not post_list.exists():
+        raise Http404('Постов пока нет.')
+    thumbnails.attach_urls(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@page_etag(('posts', 'groups', 'users'), following_state)
+@punch_holes
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'group_page', ('posts', 'groups', 'users')
+)
 def group_posts(request, slug):
     """Представление страницы группы."""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = paginator_page(posts, request)
+    thumbnails.attach_urls(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -31,45 +61,135 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@page_etag(('posts', 'follows', 'users'))
+@punch_holes
+@cache_page_versioned(
+    settings.FEED_CACHE_TIMEOUT, 'profile_page', ('posts', 'follows', 'users')
+)
 def profile(request, username):
     """Представление страницы профиля."""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.for_feed()
     page_obj = paginator_page(posts, request)
-    user = request.user
-    followers = Follow.objects.filter(author=author)
-    if user.is_authenticated:
-        following = Follow.objects.filter(
-            user=user, author=author
-        ).exists()
-    else:
-        following = False
+    thumbnails.attach_urls(page_obj)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following,
-        'followers': followers
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+def trending_page(request):
+    """Представление раздела «Популярное» за час или за сутки."""
+    window = request.GET.get('window')
+    if window not in trending.WINDOWS:
+        window = trending.DEFAULT_WINDOW
+    posts = trending.ordered(
+        Post.objects.for_feed(), trending.top(TrendBucket.POST, window)
+    )
+    thumbnails.attach_urls(posts)
+    context = {
+        'window': window,
+        'posts': posts,
+        'groups': trending.ordered(
+            Group.objects.only('title', 'slug'),
+            trending.top(TrendBucket.GROUP, window),
+        ),
+        'authors': trending.ordered(
+            User.objects.only('username', 'first_name', 'last_name'),
+            trending.top(TrendBucket.AUTHOR, window),
+        ),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@hole_context('posts/includes/follow_button.html')
+def follow_button(request, author, author_id, small=False):
+    """Контекст кнопки подписки на автора с именем author."""
+    return {
+        'author': author,
+        'following': author_id in follows.following_ids(request.user),
+        'small': small,
+    }
+
+
+@hole_context('posts/includes/suggestions.html')
+def suggestions_widget(request):
+    """Контекст блока рекомендаций «Кого читать»."""
+    return {'suggestions': suggestions.for_user(request.user)}
+
+
+def search(request):
+    """Представление страницы поиска по постам."""
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    page_obj = search_page(request, group=group, author=author)
+    thumbnails.attach_urls(page_obj)
+    query = request.GET.get('q', '')
+    filters = {'q': query, 'group': request.GET.get('group'),
+               'author': request.GET.get('author')}
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'groups': Group.objects.only('slug', 'title'),
+        'page_obj': page_obj,
+        'paginator_query': urlencode(
+            {name: value for name, value in filters.items() if value}
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def comments_page(request, post_id):
+    """Страница комментариев поста по курсору из запроса, старые первыми.
+
+    Авторы подгружаются тем же запросом, поэтому число запросов
+    не зависит ни от размера страницы, ни от числа комментариев.
+    """
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'post_id', 'author__username')
+    paginator = KeysetPaginator(
+        comments, settings.COMMENTS_PER_PAGE, COMMENT_KEYS
+    )
+    return paginator.get_page(cursor=request.GET.get('cursor'))
+
+
+@page_etag(('posts', 'groups', 'users', 'comments'))
 def post_detail(request, post_id):
     """Представление страницы информации о посте."""
-    post = get_object_or_404(Post, id=post_id)
-    author = get_object_or_404(User, posts=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    thumbnails.attach_urls([post])
     comment = CommentForm()
-    comments = post.comments.all()
+    comments = comments_page(request, post_id)
     context = {
         'post': post,
-        'author': author,
+        'author': post.author,
         'comment': comment,
         'comments': comments
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста в виде фрагмента HTML."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post_id),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     """Представление формы создания поста."""
     template = 'posts/create.html'
@@ -85,6 +205,7 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Представление формы редактирования поста."""
     template = 'posts/create.html'
@@ -109,6 +230,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -126,32 +248,21 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_page(posts, request)
+    page_obj = follow_page(request)
+    thumbnails.attach_urls(page_obj)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    is_follower = Follow.objects.filter(user=user, author=author)
-    if user != author:
-        if not is_follower.exists():
-            Follow.objects.create(
-                author=author,
-                user=user
-            )
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    follows.follow(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    user = request.user
-    followed = Follow.objects.filter(user=user, author=author)
-    if followed.exists():
-        if user != author:
-            followed.delete()
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    follows.unfollow(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
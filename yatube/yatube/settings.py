@@ -145,8 +145,63 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кеш в файле SQLite общий для всех воркеров хоста: страница рендерится
+# один раз, а не в каждом процессе.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Длина материализованной ленты подписок одного пользователя.
+FOLLOW_TIMELINE_LENGTH = 1000
+
+# Посты авторов, у которых подписчиков не меньше порога, не раскладываются
+# по лентам, а подмешиваются при чтении из кеша последних постов автора.
+FEED_CELEBRITY_FOLLOWERS = 10000
+
+FEED_CELEBRITIES_TIMEOUT = 10 * 60
+
+# Сколько последних постов автора хранится в кеше для pull-модели.
+FEED_RECENT_POSTS = 100
+
+# Время жизни закешированных страниц лент. Страницы сбрасываются сразу
+# при изменении данных (core.utils.page_cache), поэтому TTL большой.
+FEED_CACHE_TIMEOUT = 4 * 60 * 60
+
+# Время жизни закешированного множества авторов, на которых подписан
+# пользователь. Оно сбрасывается при подписке и отписке.
+FOLLOWING_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Сколько рекомендаций «Кого читать» хранится для пользователя и по
+# скольким самым похожим читателям считаются рекомендации по общим
+# подпискам.
+SUGGESTIONS_COUNT = 10
+SUGGESTIONS_SIMILAR_USERS = 20
+
+# Раздел «Популярное»: события считаются по интервалам
+# TRENDING_BUCKET_SECONDS секунд, рейтинг из TRENDING_COUNT объектов
+# пересчитывается не чаще раза в TRENDING_CACHE_TIMEOUT секунд.
+TRENDING_BUCKET_SECONDS = 5 * 60
+TRENDING_COUNT = 10
+TRENDING_CACHE_TIMEOUT = 60
+
+# Число процессов, создающих миниатюры картинок новых постов в фоне.
+# При 0 миниатюры создаются сразу при сохранении поста.
+THUMBNAIL_WORKERS = 2
+
+# Загружаемые картинки уменьшаются до POST_IMAGE_MAX_SIZE пикселей
+# по большей стороне и перекодируются в JPEG с качеством POST_IMAGE_QUALITY.
+POST_IMAGE_MAX_SIZE = 2560
+POST_IMAGE_QUALITY = 85
+
+# Поиск ранжирует по релевантности столько самых новых совпадений.
+SEARCH_RANKED_MATCHES = 10000
+
+# Комментарии на странице поста выводятся порциями по столько штук.
+COMMENTS_PER_PAGE = 20
@@ -0,0 +1,26 @@
+"""Настройки для manage.py test.
+
+Тесты получают собственный временный файл кеша, чтобы не сбрасывать
+кеш работающего сервера, а миниатюры создаются без фоновых процессов:
+те загружают обычные настройки и не видят ни тестовой базы, ни
+override_settings. pytest настраивает то же в tests/conftest.py.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+_cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': os.path.join(_cache_dir, 'cache.sqlite3'),
+    }
+}
+
+THUMBNAIL_WORKERS = 0